@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import asyncio
+import math
+import random
+import time
+
+from src.services.projectBatch import FILE_HEADER_RE
+
+
+class ResourceExhausted(Exception):
+    """Stand-in for the quota error the Gemini client raises on HTTP 429"""
+    code = 429
+
+
+class ServiceUnavailable(Exception):
+    """Stand-in for a transient HTTP 503 from the Gemini API"""
+    code = 503
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    Model latency in milliseconds.
+
+    kind is one of:
+    - "fixed": always a
+    - "uniform": between a and b
+    - "lognormal": median a, shape (sigma) b
+    - "exponential": mean a
+    """
+    kind: str = "lognormal"
+    a: float = 800.0
+    b: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.a
+        elif self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "exponential":
+            value = rng.expovariate(1.0 / self.a)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.a), self.b)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+        return max(value, 0.0) / 1000.0
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    """Async iterator of chunks produced at a fixed rate"""
+
+    def __init__(self, chunks: List[str], interval: float):
+        self._chunks = chunks
+        self._interval = interval
+
+    def __aiter__(self):
+        return self._generate()
+
+    async def _generate(self):
+        for index, text in enumerate(self._chunks):
+            if index and self._interval:
+                await asyncio.sleep(self._interval)
+            yield FakeChunk(text)
+
+
+class FakeGeminiModel:
+    """
+    Drop-in replacement for genai.GenerativeModel that never leaves the process.
+
+    Each call waits for a sampled latency (time to first byte), then either
+    fails with an injected error or returns chunk_count chunks; streamed
+    chunks arrive chunk_rate per second.
+    """
+
+    def __init__(self, latency: LatencyDistribution = None, chunk_count: int = 20, chunk_rate: float = 50.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency or LatencyDistribution()
+        self.chunk_count = max(chunk_count, 1)
+        self.chunk_rate = chunk_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def _chunks(self, prompt: str) -> List[str]:
+        paths = FILE_HEADER_RE.findall(prompt)
+        if not paths:
+            return [f"Chunk {i + 1} of a simulated answer ({len(prompt)} prompt chars). " for i in range(self.chunk_count)]
+
+        # Batch prompt: answer each file in its own `### FILE: <path>` section
+        count = max(self.chunk_count, len(paths))
+        chunks = []
+        for i in range(count):
+            index = i * len(paths) // count
+            header = f"### FILE: {paths[index]}\n" if i == 0 or index != (i - 1) * len(paths) // count else ""
+            chunks.append(f"{header}Chunk {i + 1} of a simulated answer for {paths[index]}. \n")
+        return chunks
+
+    def _maybe_fail(self) -> None:
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            raise ResourceExhausted("429 Resource has been exhausted (simulated)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise ServiceUnavailable("503 The service is currently unavailable (simulated)")
+
+    @property
+    def _interval(self) -> float:
+        return 1.0 / self.chunk_rate if self.chunk_rate else 0.0
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        self._maybe_fail()
+        chunks = self._chunks(prompt)
+        if stream:
+            return FakeStream(chunks, self._interval)
+        # A non-streaming call still pays for generating every chunk
+        await asyncio.sleep(self._interval * (len(chunks) - 1))
+        return FakeChunk("".join(chunks))
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        time.sleep(self.latency.sample(self.rng))
+        self._maybe_fail()
+        chunks = self._chunks(prompt)
+        if stream:
+            def generate():
+                for index, text in enumerate(chunks):
+                    if index and self._interval:
+                        time.sleep(self._interval)
+                    yield FakeChunk(text)
+            return generate()
+        time.sleep(self._interval * (len(chunks) - 1))
+        return FakeChunk("".join(chunks))
@@ -0,0 +1,317 @@
+"""
+Offline load test for the code-analysis API.
+
+Replaces the Gemini model with FakeGeminiModel and drives the FastAPI app
+either in-process (ASGI transport) or over a real uvicorn server, then
+reports latency percentiles, throughput and event-loop lag.
+
+    python -m benchmarks.load_test --concurrency 64 --requests 2000 --output results.json
+    python -m benchmarks.load_test --mode uvicorn --endpoint stream --compare results.json
+
+In-process mode cannot measure time to first event (httpx's ASGI transport
+buffers the whole response), so ttfb_ms is only reported for uvicorn runs.
+"""
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import threading
+import time
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGeminiModel, LatencyDistribution
+from src.pages.api import code_agent
+from src.services.responseCache import ResponseCache
+
+ENDPOINTS = {
+    "analyze": "/api/analyze-code",
+    "stream": "/api/analyze-code/stream",
+    "project": "/api/analyze-project"
+}
+
+SAMPLE_CODE = '''def fibonacci(n):
+    if n < 2:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+'''
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+    return {
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2)
+    }
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires on the loop it runs in"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected) * 1000)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+def request_body(endpoint: str, index: int, unique: bool) -> Dict[str, Any]:
+    # A distinct query per request defeats the response cache and coalescing
+    query = f"Explain this function (request {index})" if unique else "Explain this function"
+    if endpoint == "project":
+        return {
+            "query": query,
+            "files": [
+                {"name": f"module_{n}.py", "path": f"src/module_{n}.py", "type": "file",
+                 "content": SAMPLE_CODE.replace("fibonacci", f"fibonacci_{n}")}
+                for n in range(5)
+            ]
+        }
+    return {"code": SAMPLE_CODE, "query": query}
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Issue one request; returns latency, time to first event and outcome"""
+    started = time.perf_counter()
+    first_event = None
+    status = "error"
+    error_type = None
+
+    if endpoint == "analyze":
+        response = await client.post(ENDPOINTS[endpoint], json=body)
+        data = response.json()
+        status = data.get("status", "error")
+        error_type = data.get("error_type")
+    else:
+        async with client.stream("POST", ENDPOINTS[endpoint], json=body) as response:
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                    if first_event is None:
+                        first_event = time.perf_counter()
+                elif line.startswith("data: ") and event == "done":
+                    data = json.loads(line[6:])
+                    status = data.get("status", "error")
+                    error_type = data.get("error_type")
+
+    finished = time.perf_counter()
+    return {
+        "latency_ms": (finished - started) * 1000,
+        "ttfb_ms": (first_event - started) * 1000 if first_event else None,
+        "status": status,
+        "error_type": error_type
+    }
+
+
+async def drive(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    """Run args.requests requests with args.concurrency workers"""
+    results: List[Dict[str, Any]] = []
+    counter = iter(range(args.requests))
+
+    async def worker():
+        for index in counter:
+            try:
+                results.append(await send(client, args.endpoint, request_body(args.endpoint, index, not args.repeat)))
+            except Exception as e:
+                results.append({"latency_ms": None, "ttfb_ms": None, "status": "error", "error_type": type(e).__name__})
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    duration = time.perf_counter() - started
+
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["status"] != "success":
+            kind = result["error_type"] or "error"
+            errors[kind] = errors.get(kind, 0) + 1
+
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(len(results) / duration, 2) if duration else 0.0,
+        "latency_ms": percentiles([r["latency_ms"] for r in results if r["latency_ms"] is not None]),
+        "ttfb_ms": percentiles([r["ttfb_ms"] for r in results if r["ttfb_ms"] is not None])
+    }
+
+
+async def run_in_process(args) -> Dict[str, Any]:
+    monitor = LoopLagMonitor()
+    monitor.start()
+    transport = httpx.ASGITransport(app=code_agent.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            report = await drive(client, args)
+    finally:
+        monitor.stop()
+    report["loop_lag_ms"] = percentiles(monitor.samples)
+    # ASGITransport delivers the body only once the response is complete
+    report["ttfb_ms"] = None
+    return report
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_over_uvicorn(args) -> Dict[str, Any]:
+    import uvicorn
+
+    port = args.port or _free_port()
+    config = uvicorn.Config(code_agent.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    monitor = LoopLagMonitor()
+
+    async def serve():
+        # The lag monitor must share the server's loop to see its stalls
+        monitor.start()
+        try:
+            await server.serve()
+        finally:
+            monitor.stop()
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve()), daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            report = await drive(client, args)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    report["loop_lag_ms"] = percentiles(monitor.samples)
+    return report
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_app(args) -> FakeGeminiModel:
+    """Point the app's assistant at the fake model"""
+    model = FakeGeminiModel(
+        latency=LatencyDistribution(args.latency, args.latency_a, args.latency_b),
+        chunk_count=args.chunks,
+        chunk_rate=args.chunk_rate,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    assistant = code_agent.assistant
+    assistant.model = model
+    assistant.scheduler.max_concurrency = args.max_concurrency or assistant.scheduler.max_concurrency
+    assistant.scheduler.backoff_base = args.backoff_base
+    if not args.cache:
+        assistant.cache = ResponseCache(max_entries=0)
+    return model
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change in key numbers against a saved run"""
+    def delta(path: List[str]) -> str:
+        a, b = baseline["results"], current["results"]
+        for key in path:
+            a, b = a.get(key, {}), b.get(key, {})
+        if not isinstance(a, (int, float)) or not a:
+            return "n/a"
+        return f"{b:.2f} vs {a:.2f} ({(b - a) / a * 100:+.1f}%)"
+
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    for label, path in [
+        ("requests/s", ["requests_per_second"]),
+        ("latency p50", ["latency_ms", "p50"]),
+        ("latency p95", ["latency_ms", "p95"]),
+        ("latency p99", ["latency_ms", "p99"]),
+        ("loop lag p99", ["loop_lag_ms", "p99"])
+    ]:
+        print(f"  {label:<14} {delta(path)}")
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="analyze")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client workers")
+    parser.add_argument("--requests", type=int, default=500, help="total requests to send")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="override the assistant's model concurrency limit")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal", "exponential"], default="lognormal")
+    parser.add_argument("--latency-a", type=float, default=200.0, help="ms: fixed value, uniform low, lognormal median or exponential mean")
+    parser.add_argument("--latency-b", type=float, default=0.5, help="uniform high (ms) or lognormal sigma")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per response")
+    parser.add_argument("--chunk-rate", type=float, default=200.0, help="streamed chunks per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="seconds; scheduler retry backoff base")
+    parser.add_argument("--repeat", action="store_true", help="send identical requests (exercises cache/coalescing)")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--port", type=int, default=None, help="uvicorn port (default: a free port)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report from an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    model = configure_app(args)
+
+    runner = run_over_uvicorn if args.mode == "uvicorn" else run_in_process
+    results = asyncio.run(runner(args))
+    results["model_calls"] = model.calls
+    results["scheduler"] = code_agent.assistant.scheduler.stats()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "config": vars(args),
+        "results": results
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Security scanner scaling benchmark.
+
+Scans a synthetic project with the built-in rules, then again with extra
+registered rules, to check that scan time follows keyword hits rather than
+the number of rules.
+
+    python -m benchmarks.scanner_bench --files 200 --extra-rules 300
+"""
+from typing import List, Dict, Any
+import argparse
+import json
+import time
+
+from src.services import securityScanner
+from src.services.securityScanner import SecurityRule, scan_content
+
+SAMPLE_FILES = {
+    "service.py": '''import subprocess
+import hashlib
+
+
+def checksum(path, token):
+    with open(path, "rb") as handle:
+        digest = hashlib.md5(handle.read()).hexdigest()
+    subprocess.run(["sync", path])
+    return {"digest": digest, "token_length": len(token), "key": path}
+''',
+    "widget.ts": '''export function render(node: HTMLElement, html: string, query: string): void {
+  const key = query.trim().toLowerCase();
+  const result = /^[a-z]+$/.exec(key);
+  node.textContent = result ? html : "";
+}
+''',
+}
+
+
+def extra_rules(count: int) -> List[SecurityRule]:
+    return [
+        SecurityRule(f"custom-token-{n}", f"Custom token {n}", "high", rf"\bctk{n}_[0-9a-f]{{24}}\b",
+                     "Rotate the token", keywords=(f"ctk{n}_",), secret=True)
+        for n in range(count)
+    ]
+
+
+def project(file_count: int, repeat: int) -> Dict[str, str]:
+    names = list(SAMPLE_FILES)
+    return {
+        f"src/{index}_{names[index % len(names)]}": SAMPLE_FILES[names[index % len(names)]] * repeat
+        for index in range(file_count)
+    }
+
+
+def timed_scan(files: Dict[str, str], rules) -> float:
+    started = time.perf_counter()
+    for path, content in files.items():
+        scan_content(content, path, rules)
+    return time.perf_counter() - started
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the sample in each file")
+    parser.add_argument("--extra-rules", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    files = project(args.files, args.repeat)
+    builtin = tuple(securityScanner.RULES)
+    extended = builtin + tuple(extra_rules(args.extra_rules))
+    # Warm the compiled-pattern caches so both runs measure scanning only
+    timed_scan(dict(list(files.items())[:2]), builtin)
+    timed_scan(dict(list(files.items())[:2]), extended)
+
+    report = {
+        "files": args.files,
+        "bytes": sum(len(content) for content in files.values()),
+        "builtin_rules": len(builtin),
+        "builtin_seconds": round(timed_scan(files, builtin), 3),
+        "extended_rules": len(extended),
+        "extended_seconds": round(timed_scan(files, extended), 3),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
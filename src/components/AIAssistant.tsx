@@ -30,7 +30,7 @@ export const AIAssistant: React.FC<AIAssistantProps> = ({ code, fileName }) => {
     setIsLoading(true);
 
     try {
-      const response = await fetch('http://localhost:8000/api/analyze-code', {
+      const response = await fetch('http://localhost:8000/api/analyze-code/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -41,16 +41,53 @@ export const AIAssistant: React.FC<AIAssistantProps> = ({ code, fileName }) => {
         }),
       });
 
-      const data = await response.json();
-      
-      if (data.status === 'success') {
-        setMessages(prev => [...prev, { 
-          role: 'assistant', 
-          content: data.response 
-        }]);
-      } else {
+      if (!response.body || !response.headers.get('content-type')?.includes('text/event-stream')) {
+        const data = await response.json();
         throw new Error(data.response || 'Failed to get response');
       }
+
+      // Show the reply as soon as the first chunk arrives
+      setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
+      const appendToReply = (text: string) => {
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+        });
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let finalStatus: { status: string; response?: string } | null = null;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE frames are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!event || !data) continue;
+
+          const payload = JSON.parse(data);
+          if (event === 'chunk') {
+            appendToReply(payload.text);
+          } else if (event === 'done') {
+            finalStatus = payload;
+          }
+        }
+      }
+
+      if (finalStatus?.status !== 'success') {
+        setMessages(prev => prev.slice(0, -1));
+        throw new Error(finalStatus?.response || 'Failed to get response');
+      }
     } catch (error) {
       console.error('Error:', error);
       setMessages(prev => [...prev, { 
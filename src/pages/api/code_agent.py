@@ -1,18 +1,79 @@
+import asyncio
+import json
+import os
+import time
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from src.services.codeAgent import CodeAssistant
+from starlette.datastructures import MutableHeaders
+from src.services.codeAgent import CodeAssistant, CodeAnalyticsService
+from src.services.projectBatch import flatten_files
+from src.services.instrumentation import (
+    REGISTRY,
+    IN_FLIGHT,
+    timed,
+    record_stage,
+    record_error,
+    start_request_timing,
+    format_server_timing
+)
 
 app = FastAPI()
 
+# Per-request stage timings in a Server-Timing header (off by default)
+SERVER_TIMING_ENABLED = os.getenv("ANALYSIS_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
 # Add required security headers
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
-    response.headers["Cross-Origin-Opener-Policy"] = "same-origin"
-    return response
+class SecurityHeadersMiddleware:
+    """
+    Security headers and request timing, as plain ASGI middleware.
+
+    Unlike @app.middleware("http"), this passes receive() through untouched,
+    so endpoints still see http.disconnect when the client goes away.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Timed until the last body chunk is sent, so streams count in full
+        timings = start_request_timing()
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                IN_FLIGHT.dec()
+                record_stage("request_total", time.perf_counter() - started)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["Cross-Origin-Embedder-Policy"] = "require-corp"
+                headers["Cross-Origin-Opener-Policy"] = "same-origin"
+                if SERVER_TIMING_ENABLED and timings:
+                    # Headers go out before the body, so "total" here is time to headers
+                    headers["Server-Timing"] = format_server_timing(
+                        {**timings, "request_total": time.perf_counter() - started}
+                    )
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            finish()
+
+app.add_middleware(SecurityHeadersMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,19 +84,177 @@ app.add_middleware(
 )
 
 assistant = CodeAssistant()
+analytics = CodeAnalyticsService()
+
+# How often a pending analysis checks whether its client has gone away
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def run_until_disconnected(request: Request, coro):
+    """Await coro, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                record_error("client_disconnected")
+                return {"status": "error", "response": "Client disconnected"}
+    finally:
+        if not task.done():
+            task.cancel()
 
 @app.post("/api/analyze-code")
 async def analyze_code(request: Request):
     try:
-        body = await request.json()
-        code = body.get("code", "")  # Default to empty string
-        query = body.get("query")
+        with timed("request_parse"):
+            body = await request.json()
+            code = body.get("code", "")  # Default to empty string
+            query = body.get("query")
         
         # Allow empty code if there's a query
         if not code and not query:
             raise HTTPException(status_code=400, detail="No code or query provided")
             
-        result = assistant.analyze_code(code, query)
+        result = await run_until_disconnected(
+            request, assistant.analyze_code_async(code, query)
+        )
         return result
     except Exception as e:
-        return {"status": "error", "response": str(e)}
\ No newline at end of file
+        record_error(type(e).__name__)
+        return {"status": "error", "response": str(e)}
+
+def format_sse(event: dict) -> str:
+    """Encode an analysis event as a Server-Sent Events frame"""
+    name = event.pop("event")
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+@app.post("/api/analyze-code/stream")
+async def analyze_code_stream(request: Request):
+    """Stream model output as SSE `chunk` events followed by a `done` event"""
+    try:
+        with timed("request_parse"):
+            body = await request.json()
+            code = body.get("code", "")
+            query = body.get("query")
+
+        if not isinstance(code, str) or (query is not None and not isinstance(query, str)):
+            raise HTTPException(status_code=400, detail="code and query must be strings")
+        if not code and not query:
+            raise HTTPException(status_code=400, detail="No code or query provided")
+    except Exception as e:
+        record_error(type(e).__name__)
+        return {"status": "error", "response": str(e)}
+
+    async def event_stream():
+        events = assistant.stream_analysis(code, query)
+        try:
+            async for event in events:
+                # Stop pulling from the model once nobody is listening
+                if await request.is_disconnected():
+                    record_error("client_disconnected")
+                    break
+                yield format_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction counters for the analysis response cache"""
+    return assistant.cache.stats()
+
+@app.get("/api/scheduler/stats")
+async def scheduler_stats():
+    """Queue depth, wait times and retry counters for model calls"""
+    return assistant.scheduler.stats()
+
+@app.post("/api/analyze-project")
+async def analyze_project(request: Request):
+    """Analyze a whole FileStructure tree, streaming SSE `file` events and a final `done` event"""
+    try:
+        with timed("request_parse"):
+            body = await request.json()
+            files = body.get("files") or []
+            query = body.get("query")
+            token_budget = body.get("token_budget")
+
+        if not isinstance(files, list):
+            raise HTTPException(status_code=400, detail="files must be a list")
+        if not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+        if query is not None and not isinstance(query, str):
+            raise HTTPException(status_code=400, detail="query must be a string")
+        # bool is an int subclass; reject it along with zero and negatives
+        if token_budget is not None and (type(token_budget) is not int or token_budget <= 0):
+            raise HTTPException(status_code=400, detail="token_budget must be a positive integer")
+    except Exception as e:
+        record_error(type(e).__name__)
+        return {"status": "error", "response": str(e)}
+
+    async def event_stream():
+        events = assistant.analyze_project(files, query, token_budget=token_budget)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    record_error("client_disconnected")
+                    break
+                yield format_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/scan-project")
+async def scan_project(request: Request):
+    """Scan a whole FileStructure tree for hardcoded secrets and dangerous calls"""
+    try:
+        with timed("request_parse"):
+            body = await request.json()
+            files = dict(flatten_files(body.get("files") or []))
+
+        if not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+
+        # Large trees fan out to a process pool; keep the event loop free meanwhile
+        loop = asyncio.get_running_loop()
+        security, counts = await loop.run_in_executor(None, analytics.generate_project_security, files)
+        return {"status": "success", **security.dict(), **counts}
+    except Exception as e:
+        record_error(type(e).__name__)
+        return {"status": "error", "response": str(e)}
+
+def assistant_samples():
+    """Cache and scheduler state, reported at scrape time"""
+    cache = assistant.cache.stats()
+    scheduler = assistant.scheduler.stats()
+    samples = [
+        ("analysis_cache_hits_total", "counter", "Response cache hits.", {}, cache["hits"]),
+        ("analysis_cache_misses_total", "counter", "Response cache misses.", {}, cache["misses"]),
+        ("analysis_cache_evictions_total", "counter", "Response cache LRU evictions.", {}, cache["evictions"]),
+        ("analysis_cache_entries", "gauge", "Entries in the in-memory response cache.", {}, cache["size"]),
+        ("analysis_model_calls_in_flight", "gauge", "Model calls currently admitted by the scheduler.", {}, scheduler["in_flight"]),
+        ("analysis_model_retries_total", "counter", "Model calls retried after a retryable error.", {}, scheduler["retries"]),
+        ("analysis_model_coalesced_total", "counter", "Requests that shared an in-flight model call.", {}, scheduler["coalesced"]),
+        ("analysis_model_rate_limited_total", "counter", "Model calls rejected for quota (429).", {}, scheduler["rate_limited"])
+    ]
+    for priority, depth in scheduler["queue_depth"].items():
+        samples.append(("analysis_scheduler_queue_depth", "gauge", "Requests waiting for a model slot.", {"priority": priority}, depth))
+    return samples
+
+REGISTRY.add_collector(assistant_samples)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,99 +1,171 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Union, Any
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-import random
+from typing import List, Dict, Optional, Union, Any, Iterator, Tuple
+from datetime import datetime
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
-from enum import Enum
 import json
 import ast
 import re
 import time
+import asyncio
+import contextvars
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from src.services.responseCache import ResponseCache, make_cache_key
+from src.services.models import (
+    CodeLanguage,
+    CodeAnalysisLevel,
+    ScrapedData,
+    DataSource,
+    CodeMetrics,
+    SecurityAnalysis,
+    PerformanceMetrics,
+    CodePattern,
+    ScrapingMetrics,
+    SearchResult,
+    CodeAnalysis
+)
+from src.services.sourceAdapters import build_adapters, create_http_client
+from src.services.staticMetrics import StaticMetricsEngine, FileMetrics, code_smells, detect_language
+from src.services.historyStore import AnalysisHistory
+from src.services.securityScanner import SecurityScanner, security_score, security_recommendations
+from src.services.projectBatch import (
+    ProjectFile,
+    flatten_files,
+    dedupe_files,
+    pack_chunks,
+    build_batch_prompt,
+    split_batch_response,
+    CHUNK_OVERHEAD_TOKENS
+)
+from src.services.promptBuilder import PromptBuilder, estimate_tokens
+from src.services.instrumentation import timed, record_stage, record_error
+from src.services.modelScheduler import (
+    ModelScheduler,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BATCH,
+    is_rate_limit_error
+)
 
 load_dotenv()
 
-class CodeLanguage(Enum):
-    PYTHON = "python"
-    TYPESCRIPT = "typescript"
-    JAVASCRIPT = "javascript"
-    REACT = "react"
-    HTML = "html"
-    CSS = "css"
-
-class CodeAnalysisLevel(Enum):
-    BASIC = "basic"
-    INTERMEDIATE = "intermediate"
-    ADVANCED = "advanced"
-    EXPERT = "expert"
-
-@dataclass
-class ScrapedData:
-    source: str
-    timestamp: datetime
-    data: Any
-    metadata: Dict[str, Any]
-
-class DataSource(Enum):
-    GITHUB = "github"
-    STACKOVERFLOW = "stackoverflow"
-    NPM = "npm"
-    PYPI = "pypi"
-    DEV_TO = "dev.to"
-    MEDIUM = "medium"
-
-class CodeMetrics(BaseModel):
-    lines_of_code: int
-    complexity: float
-    maintainability_index: float
-    code_smells: List[str]
-    suggestions: List[str]
-
-class SecurityAnalysis(BaseModel):
-    vulnerabilities: List[Dict[str, str]]
-    security_score: float
-    recommendations: List[str]
-
-class PerformanceMetrics(BaseModel):
-    time_complexity: str
-    space_complexity: str
-    optimization_tips: List[str]
-
-class CodePattern(BaseModel):
-    name: str
-    description: str
-    examples: List[str]
-    use_cases: List[str]
-
-class ScrapingMetrics(BaseModel):
-    total_items: int
-    sources_checked: List[str]
-    time_taken: float
-    success_rate: float
-
-class SearchResult(BaseModel):
-    title: str
-    url: str
-    description: str
-    source: str
-    score: float
-    last_updated: datetime
-
-class CodeAnalysis(BaseModel):
-    explanation: str
-    suggestions: List[str]
-    metrics: Optional[CodeMetrics]
-    security: Optional[SecurityAnalysis]
-    performance: Optional[PerformanceMetrics]
-    patterns: List[CodePattern]
-    timestamp: datetime
+logger = logging.getLogger(__name__)
+
+# Chunks buffered between a sync model stream and its async consumer
+STREAM_QUEUE_SIZE = 8
+
+# Part of every response cache key; bump whenever _build_prompt changes
+PROMPT_VERSION = "2"
+
+# Default question for whole-project analysis
+DEFAULT_PROJECT_QUERY = "Explain what this file does and suggest concrete improvements."
 
 class CodeAssistant:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = None, timeout: float = None):
         api_key = ""
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self.model_name = "gemini-2.0-flash"
+        self.model = genai.GenerativeModel(self.model_name)
+
+        # Async path settings: global cap on in-flight model calls and a
+        # per-request deadline covering both the queue wait and the model call
+        self.max_concurrency = max_concurrency or int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "32"))
+        self.timeout = timeout or float(os.getenv("ANALYSIS_TIMEOUT", "60"))
+        # Quota limits are off unless configured; 0 also means unlimited
+        self.scheduler = ModelScheduler(
+            max_concurrency=self.max_concurrency,
+            requests_per_minute=float(os.getenv("ANALYSIS_RPM", "0")) or None,
+            tokens_per_minute=float(os.getenv("ANALYSIS_TPM", "0")) or None,
+            max_retries=int(os.getenv("ANALYSIS_MAX_RETRIES", "3"))
+        )
+        # Sync model calls (when the client has no native async API) and prompt compaction
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="code-assistant"
+        )
+
+        # Successful responses only; ANALYSIS_CACHE_PATH enables the shared disk tier
+        self.cache = ResponseCache(
+            max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "3600")),
+            path=os.getenv("ANALYSIS_CACHE_PATH") or None
+        )
+        # Upper bound on estimated prompt tokens per whole-project chunk
+        self.batch_token_budget = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "24000"))
+        # Code over ANALYSIS_PROMPT_MAX_TOKENS is compacted before prompting
+        strategies = os.getenv("ANALYSIS_PROMPT_STRATEGIES")
+        self.prompt_builder = PromptBuilder(
+            max_tokens=int(os.getenv("ANALYSIS_PROMPT_MAX_TOKENS", "8000")),
+            strategies=strategies.split(",") if strategies else None
+        )
+
+    def _cache_key(self, code: str = None, query: str = None) -> str:
+        return make_cache_key(code, query, self.model_name, f"{PROMPT_VERSION}:{self.prompt_builder.config_key}")
+
+    def _failure(self, e: Exception) -> dict:
+        """Error result for a failed model call; quota errors are reported as such"""
+        if is_rate_limit_error(e):
+            record_error("rate_limited")
+            return {
+                "status": "error",
+                "error_type": "rate_limited",
+                "response": "Model quota exceeded, please retry shortly"
+            }
+        record_error(type(e).__name__)
+        logger.exception("Error in analysis: %s", e)
+        return {
+            "status": "error",
+            "response": f"Analysis failed: {str(e)}"
+        }
+
+    def _render_prompt(self, code: str = None, query: str = None) -> Optional[str]:
+        """Fill the prompt template, or return None if there is nothing to ask"""
+        if code and query:
+            # Code-specific analysis
+            return f"""
+                Code to analyze:
+                ```
+                {code}
+                ```
+                Query: {query}
+                Please provide a detailed response.
+                """
+        elif query:
+            # General programming query
+            return f"Query: {query}\nPlease provide a detailed response."
+        return None
+
+    def _build_prompt(self, code: str = None, query: str = None) -> Tuple[Optional[str], dict]:
+        """
+        Build the model prompt, compacting the code if it is over budget.
+
+        Returns the prompt (None if there is nothing to ask) and the estimated
+        prompt token counts before and after compaction.
+        """
+        with timed("prompt_build"):
+            prompt = self._render_prompt(code, query)
+            if prompt is None:
+                return None, {}
+            original_tokens = estimate_tokens(prompt)
+            compaction = self.prompt_builder.compact(code, query) if code else None
+            if compaction and compaction.strategies:
+                prompt = self._render_prompt(compaction.code, query)
+        return prompt, {
+            "original": original_tokens,
+            "compacted": estimate_tokens(prompt),
+            "strategies": compaction.strategies if compaction else []
+        }
+
+    async def _build_prompt_async(self, code: str = None, query: str = None) -> Tuple[Optional[str], dict]:
+        """_build_prompt, with over-budget compaction (AST parsing etc.) run off the event loop"""
+        if code and estimate_tokens(code) > self.prompt_builder.max_tokens:
+            loop = asyncio.get_running_loop()
+            # copy_context keeps the request's stage timings attached
+            return await loop.run_in_executor(
+                self._executor, contextvars.copy_context().run, self._build_prompt, code, query
+            )
+        return self._build_prompt(code, query)
 
     def analyze_code(self, code: str = None, query: str = None) -> dict:
         """
@@ -104,46 +176,413 @@ class CodeAssistant:
             query (str, optional): Question or query about the code/general programming
         """
         try:
-            if code and query:
-                # Code-specific analysis
-                prompt = f"""
-                Code to analyze:
-                ```
-                {code}
-                ```
-                Query: {query}
-                Please provide a detailed response.
-                """
-            elif query:
-                # General programming query
-                prompt = f"Query: {query}\nPlease provide a detailed response."
-            else:
+            if not code and not query:
                 return {
                     "status": "error",
                     "response": "Either code or query must be provided"
                 }
 
+            # The cache key does not depend on the compacted prompt, so check it first
+            cache_key = self._cache_key(code, query)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+            prompt, prompt_tokens = self._build_prompt(code, query)
+
             # Generate response using Gemini model
             response = self.model.generate_content(prompt)
-            return {
+            result = {
                 "status": "success",
-                "response": response.text
+                "response": response.text,
+                "prompt_tokens": prompt_tokens
             }
+            self.cache.set(cache_key, result)
+            return result
 
         except Exception as e:
-            print(f"Error in analysis: {str(e)}")
+            return self._failure(e)
+
+    async def _generate_async(self, prompt: str):
+        """Call the model without blocking the event loop"""
+        if hasattr(self.model, "generate_content_async"):
+            return await self.model.generate_content_async(prompt)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.model.generate_content, prompt)
+
+    async def _timed_generate(self, prompt: str):
+        with timed("model_total"):
+            return await self._generate_async(prompt)
+
+    async def _scheduled_generate(self, prompt: str, priority: int = PRIORITY_INTERACTIVE):
+        """Generate through the scheduler; identical in-flight prompts share one call"""
+        return await self.scheduler.run(
+            lambda: self._timed_generate(prompt),
+            priority=priority,
+            tokens=estimate_tokens(prompt),
+            key=(self.model_name, prompt)
+        )
+
+    async def analyze_code_async(self, code: str = None, query: str = None, timeout: float = None) -> dict:
+        """
+        Async variant of analyze_code for use inside the event loop.
+
+        Args:
+            code (str, optional): Code to analyze
+            query (str, optional): Question or query about the code/general programming
+            timeout (float, optional): Deadline in seconds, defaults to self.timeout
+
+        Cancelling the awaiting task (e.g. on client disconnect) cancels the
+        pending model call and frees its concurrency slot.
+        """
+        try:
+            if not code and not query:
+                return {
+                    "status": "error",
+                    "response": "Either code or query must be provided"
+                }
+
+            # The cache key does not depend on the compacted prompt, so check it first
+            cache_key = self._cache_key(code, query)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+            prompt, prompt_tokens = await self._build_prompt_async(code, query)
+            response = await asyncio.wait_for(
+                self._scheduled_generate(prompt),
+                timeout=timeout or self.timeout
+            )
+            result = {
+                "status": "success",
+                "response": response.text,
+                "prompt_tokens": prompt_tokens
+            }
+            await self.cache.aset(cache_key, result)
+            return result
+
+        except asyncio.TimeoutError:
+            record_error("timeout")
             return {
                 "status": "error",
-                "response": f"Analysis failed: {str(e)}"
+                "response": f"Analysis timed out after {timeout or self.timeout:g}s"
+            }
+        except Exception as e:
+            return self._failure(e)
+
+    async def _stream_async(self, prompt: str):
+        """Yield response text chunks as the model produces them"""
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+            return
+
+        # Drive the sync streaming API from a worker thread. The bounded queue
+        # blocks the producer when the consumer falls behind (back-pressure).
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        return
+                    if chunk.text:
+                        asyncio.run_coroutine_threadsafe(queue.put(chunk.text), loop).result()
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+            except Exception as e:
+                if not stop.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue
+            while not queue.empty():
+                queue.get_nowait()
+            producer.cancel()
+
+    async def stream_analysis(self, code: str = None, query: str = None, timeout: float = None):
+        """
+        Stream an analysis as events.
+
+        Yields {"event": "chunk", "text": ...} for each piece of model output,
+        then exactly one {"event": "done", ...} carrying the final status and
+        timings in milliseconds. Closing the generator early stops the model
+        stream and frees its concurrency slot.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + (timeout or self.timeout)
+        first_chunk_at = None
+        chunks = 0
+        status, error, error_type = "success", None, None
+
+        if not code and not query:
+            yield {
+                "event": "done",
+                "status": "error",
+                "response": "Either code or query must be provided",
+                "chunks": 0,
+                "ttfb_ms": None,
+                "elapsed_ms": 0.0
+            }
+            return
+
+        cache_key = self._cache_key(code, query)
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            yield {"event": "chunk", "text": cached["response"]}
+            yield {
+                "event": "done",
+                "status": "success",
+                "cached": True,
+                "chunks": 1,
+                "ttfb_ms": round((loop.time() - started) * 1000, 2),
+                "elapsed_ms": round((loop.time() - started) * 1000, 2),
+                "prompt_tokens": cached.get("prompt_tokens", {})
             }
+            return
+
+        parts = []
+        prompt_tokens = {}
+        try:
+            prompt, prompt_tokens = await self._build_prompt_async(code, query)
+            model_started = None
+
+            def open_model_stream():
+                nonlocal model_started
+                model_started = loop.time()
+                return self._stream_async(prompt)
+
+            # Rate limits and transient errors before the first chunk are retried;
+            # nothing has reached the client yet
+            stream, head = await asyncio.wait_for(
+                self.scheduler.open_stream(open_model_stream, PRIORITY_INTERACTIVE, estimate_tokens(prompt)),
+                timeout=deadline - loop.time()
+            )
+            try:
+                while True:
+                    try:
+                        text = head.pop() if head else await asyncio.wait_for(stream.__anext__(), timeout=deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    if first_chunk_at is None:
+                        first_chunk_at = loop.time()
+                        record_stage("model_ttfb", first_chunk_at - model_started)
+                    chunks += 1
+                    parts.append(text)
+                    yield {"event": "chunk", "text": text}
+            finally:
+                await stream.aclose()
+                self.scheduler.release()
+                record_stage("model_total", loop.time() - model_started)
+        except asyncio.TimeoutError:
+            record_error("timeout")
+            status, error = "error", f"Analysis timed out after {timeout or self.timeout:g}s"
+        except Exception as e:
+            failure = self._failure(e)
+            status, error = "error", failure["response"]
+            error_type = failure.get("error_type")
+
+        if status == "success":
+            await self.cache.aset(cache_key, {"status": "success", "response": "".join(parts), "prompt_tokens": prompt_tokens})
+
+        event = {
+            "event": "done",
+            "status": status,
+            "chunks": chunks,
+            "ttfb_ms": round((first_chunk_at - started) * 1000, 2) if first_chunk_at else None,
+            "elapsed_ms": round((loop.time() - started) * 1000, 2),
+            "prompt_tokens": prompt_tokens
+        }
+        if error:
+            event["response"] = error
+        if error_type:
+            event["error_type"] = error_type
+        yield event
+
+    async def _analyze_chunk(self, chunk: List[ProjectFile], query: str, timeout: float, cache_keys: Dict[str, str]) -> List[dict]:
+        """
+        Analyze one packed chunk of files with a single model call.
+
+        Files the model left without a `### FILE:` section are retried one
+        per prompt before being reported as errors.
+        """
+        paths = [file.path for file in chunk]
+        try:
+            response = await asyncio.wait_for(
+                self._scheduled_generate(build_batch_prompt(chunk, query), PRIORITY_BATCH),
+                timeout=timeout
+            )
+            answers = split_batch_response(response.text, paths)
+        except asyncio.TimeoutError:
+            record_error("timeout")
+            return [
+                {"path": path, "status": "error", "response": f"Analysis timed out after {timeout:g}s"}
+                for path in paths
+            ]
+        except Exception as e:
+            failure = self._failure(e)
+            return [{"path": path, **failure} for path in paths]
+
+        results = []
+        unanswered = []
+        for file in chunk:
+            answer = answers.get(file.path)
+            if not answer:
+                unanswered.append(file)
+                continue
+            result = {"status": "success", "response": answer}
+            await self.cache.aset(cache_keys[file.path], result)
+            results.append({"path": file.path, **result})
+
+        if len(chunk) == 1:
+            results.extend(
+                {"path": file.path, "status": "error", "response": "No answer returned for this file"}
+                for file in unanswered
+            )
+        elif unanswered:
+            retried = await asyncio.gather(*[
+                self._analyze_chunk([file], query, timeout, cache_keys) for file in unanswered
+            ])
+            results.extend(result for single in retried for result in single)
+        return results
+
+    def _project_cache_key(self, file: ProjectFile, query: str, compaction: str = "") -> str:
+        # Batch answers come from a different prompt than single-file ones
+        return make_cache_key(file.content, query, self.model_name, f"{PROMPT_VERSION}-batch{compaction}")
+
+    async def analyze_project(self, tree: List[dict], query: str = None, token_budget: int = None, timeout: float = None):
+        """
+        Analyze every file in a FileStructure tree.
+
+        Byte-identical files are analyzed once, cached files are answered
+        immediately, and the rest are packed into prompts that fit
+        token_budget and dispatched concurrently. Yields one
+        {"event": "file", ...} per file as its chunk completes, then a final
+        {"event": "done", ...} summary, also when the analysis itself fails.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        events = self._project_events(tree, query, token_budget, timeout)
+        try:
+            async for event in events:
+                yield event
+        except Exception as e:
+            record_error(type(e).__name__)
+            logger.exception("Error in project analysis: %s", e)
+            yield {
+                "event": "done",
+                "status": "error",
+                "response": f"Analysis failed: {str(e)}",
+                "elapsed_ms": round((loop.time() - started) * 1000, 2)
+            }
+        finally:
+            await events.aclose()
+
+    async def _project_events(self, tree: List[dict], query: str, token_budget: int, timeout: float):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        query = query or DEFAULT_PROJECT_QUERY
+        token_budget = token_budget or self.batch_token_budget
+        timeout = timeout or self.timeout
+
+        files = flatten_files(tree)
+        unique, duplicates = dedupe_files(files)
+
+        # Files that cannot fit a chunk on their own are compacted, and their
+        # answers depend on the compaction settings; keys use the original content
+        file_budget = max(token_budget - CHUNK_OVERHEAD_TOKENS, 1)
+        file_builder = PromptBuilder(max_tokens=file_budget, strategies=self.prompt_builder.strategies)
+        cache_keys = {
+            file.path: self._project_cache_key(file, query, f":{file_builder.config_key}" if file.tokens > file_budget else "")
+            for file in unique
+        }
+        prompt_tokens = {}
+        duplicates_of: Dict[str, List[str]] = {}
+        for path, original in duplicates.items():
+            duplicates_of.setdefault(original, []).append(path)
+
+        def with_duplicates(result: dict):
+            if result["path"] in prompt_tokens:
+                result = {**result, "prompt_tokens": prompt_tokens[result["path"]]}
+            yield {"event": "file", **result}
+            for path in duplicates_of.get(result["path"], []):
+                yield {"event": "file", **result, "path": path, "duplicate_of": result["path"]}
+
+        counts = {"success": 0, "error": 0}
+        pending = []
+        for file in unique:
+            cached = await self.cache.aget(cache_keys[file.path])
+            if cached is None:
+                pending.append(file)
+                continue
+            counts["success"] += 1 + len(duplicates_of.get(file.path, []))
+            for event in with_duplicates({"path": file.path, **cached, "cached": True}):
+                yield event
+
+        # Only files that missed the cache pay for compaction, off the event loop
+        def compact_oversized():
+            for file in pending:
+                if file.tokens > file_budget:
+                    compaction = file_builder.compact(file.content, query, detect_language(file.content, file.path))
+                    file.content, file.tokens = compaction.code, compaction.compacted_tokens
+                    prompt_tokens[file.path] = {
+                        "original": compaction.original_tokens,
+                        "compacted": compaction.compacted_tokens,
+                        "strategies": compaction.strategies
+                    }
+
+        if any(file.tokens > file_budget for file in pending):
+            await loop.run_in_executor(self._executor, contextvars.copy_context().run, compact_oversized)
+
+        chunks = pack_chunks(pending, token_budget)
+        tasks = [asyncio.ensure_future(self._analyze_chunk(chunk, query, timeout, cache_keys)) for chunk in chunks]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    counts[result["status"]] += 1 + len(duplicates_of.get(result["path"], []))
+                    for event in with_duplicates(result):
+                        yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield {
+            "event": "done",
+            "status": "success" if counts["error"] == 0 else "error",
+            "files": len(files),
+            "unique_files": len(unique),
+            "chunks": len(chunks),
+            "succeeded": counts["success"],
+            "failed": counts["error"],
+            "elapsed_ms": round((loop.time() - started) * 1000, 2)
+        }
         
 # ...existing code up to CodeAssistant class...
 
 class CodeAnalyticsService:
     """Handles demo analytics, metrics, and web scraping functionality"""
     
-    def __init__(self):
-        self.analysis_history = []
+    def __init__(self, adapters: dict = None, source_timeout: float = None, offline: bool = None):
+        # Recent entries in memory; ANALYSIS_HISTORY_PATH keeps everything on disk
+        self.analysis_history = AnalysisHistory(
+            path=os.getenv("ANALYSIS_HISTORY_PATH") or None,
+            buffer_size=int(os.getenv("ANALYSIS_HISTORY_BUFFER", "100"))
+        )
         self.data_sources = {
             DataSource.GITHUB: "https://api.github.com",
             DataSource.STACKOVERFLOW: "https://api.stackexchange.com",
@@ -152,33 +591,66 @@ class CodeAnalyticsService:
             DataSource.DEV_TO: "https://dev.to/api",
             DataSource.MEDIUM: "https://api.medium.com"
         }
+        if offline is None:
+            offline = os.getenv("ANALYTICS_OFFLINE", "").lower() in ("1", "true", "yes")
+        self.adapters = adapters or build_adapters(self.data_sources, offline=offline)
+        # Slow sources are dropped after this many seconds; the rest still return
+        self.source_timeout = source_timeout or float(os.getenv("ANALYTICS_SOURCE_TIMEOUT", "3"))
+        self.search_cache = ResponseCache(
+            max_entries=256,
+            ttl=float(os.getenv("ANALYTICS_SEARCH_CACHE_TTL", "900"))
+        )
+        self._client = None
+        self._client_loop = None
+        self.metrics_engine = StaticMetricsEngine()
+        self.security_scanner = SecurityScanner()
 
-    def generate_demo_metrics(self, code: str) -> CodeMetrics:
-        """Generate demo code quality metrics"""
+    def _to_code_metrics(self, metrics: FileMetrics) -> CodeMetrics:
+        smells, suggestions = code_smells(metrics)
         return CodeMetrics(
-            lines_of_code=len(code.splitlines()),
-            complexity=round(random.uniform(1.0, 10.0), 2),
-            maintainability_index=round(random.uniform(60.0, 100.0), 2),
-            code_smells=["Deep nesting", "Long method", "Duplicate code"],
-            suggestions=["Extract method", "Use dependency injection", "Add error handling"]
+            lines_of_code=metrics.lines_of_code,
+            complexity=metrics.complexity,
+            maintainability_index=metrics.maintainability_index,
+            code_smells=smells,
+            suggestions=suggestions,
+            halstead_volume=metrics.halstead_volume,
+            nesting_depth=metrics.nesting_depth,
+            functions=[vars(f) for f in metrics.functions]
         )
 
-    def generate_demo_security(self, code: str) -> SecurityAnalysis:
-        """Generate demo security analysis"""
+    def generate_demo_metrics(self, code: str, language: str = None) -> CodeMetrics:
+        """Compute code quality metrics locally from the parsed source"""
+        return self._to_code_metrics(self.metrics_engine.analyze(code, language))
+
+    def generate_project_metrics(self, files: Dict[str, str]) -> Dict[str, CodeMetrics]:
+        """Compute metrics for many files at once, parsing them in a process pool"""
+        return {
+            path: self._to_code_metrics(metrics)
+            for path, metrics in self.metrics_engine.analyze_files(files).items()
+        }
+
+    def _to_security_analysis(self, findings: List[Dict[str, str]]) -> SecurityAnalysis:
         return SecurityAnalysis(
-            vulnerabilities=[
-                {"type": "SQL Injection", "severity": "high"},
-                {"type": "XSS", "severity": "medium"},
-                {"type": "CSRF", "severity": "low"}
-            ],
-            security_score=round(random.uniform(7.0, 9.9), 2),
-            recommendations=[
-                "Use parameterized queries",
-                "Implement input validation",
-                "Add rate limiting"
-            ]
+            vulnerabilities=findings,
+            security_score=security_score(findings),
+            recommendations=security_recommendations(findings)
         )
 
+    def generate_demo_security(self, code: str, path: str = None) -> SecurityAnalysis:
+        """Scan code locally for hardcoded secrets and dangerous calls"""
+        return self._to_security_analysis(self.security_scanner.scan(code, path))
+
+    def generate_project_security(self, files: Dict[str, str]) -> Tuple[SecurityAnalysis, Dict[str, int]]:
+        """Scan many files, skipping ones unchanged since the last scan; returns the analysis and file counts"""
+        results, skipped = self.security_scanner.scan_files(files)
+        findings = [finding for path in files for finding in results[path]]
+        counts = {
+            "files_scanned": len(files) - skipped,
+            "files_skipped": skipped,
+            "files_with_findings": sum(1 for path in files if results[path])
+        }
+        return self._to_security_analysis(findings), counts
+
     def generate_demo_performance(self, code: str) -> PerformanceMetrics:
         """Generate demo performance metrics"""
         return PerformanceMetrics(
@@ -191,76 +663,138 @@ class CodeAnalyticsService:
             ]
         )
 
-    def simulate_web_scraping(self, query: str, sources: List[DataSource] = None) -> List[SearchResult]:
-        """Simulate scraping multiple platforms for code examples and discussions"""
+    async def _get_client(self):
+        """Return the pooled HTTP client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = create_http_client(timeout=self.source_timeout)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    async def _search_source(self, source: DataSource, query: str, client) -> Optional[List[SearchResult]]:
+        """Query one source, returning None if it failed or timed out"""
+        cache_key = f"{source.value}:{query.strip().lower()}"
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached["results"]
+        try:
+            results = await asyncio.wait_for(
+                self.adapters[source].search(query, client),
+                timeout=self.source_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Source %s timed out after %gs", source.value, self.source_timeout)
+            return None
+        except Exception as e:
+            logger.warning("Source %s failed: %s", source.value, e)
+            return None
+        self.search_cache.set(cache_key, {"results": results})
+        return results
+
+    async def scrape_sources(self, query: str, sources: List[DataSource] = None, client=None) -> tuple:
+        """
+        Search all sources concurrently.
+
+        Returns the merged results sorted by score together with measured
+        ScrapingMetrics. Sources that fail or exceed source_timeout are left
+        out rather than failing the whole search. Uses the pooled client
+        unless one is passed in.
+        """
         if sources is None:
-            sources = list(DataSource)
+            sources = list(self.adapters)
 
-        results = []
-        for source in sources:
-            # Simulate delay for realism
-            time.sleep(0.5)
-            
-            # Generate demo results
-            results.extend([
-                SearchResult(
-                    title=f"Example {i+1} from {source.value}",
-                    url=f"{self.data_sources[source]}/example{i+1}",
-                    description=f"Related code example or discussion about {query}",
-                    source=source.value,
-                    score=round(random.uniform(0.5, 1.0), 2),
-                    last_updated=datetime.now() - timedelta(days=random.randint(1, 30))
-                )
-                for i in range(3)
-            ])
+        started = time.perf_counter()
+        needs_network = any(self.adapters[s].requires_network for s in sources)
+        if client is None and needs_network:
+            client = await self._get_client()
+        outcomes = await asyncio.gather(*[
+            self._search_source(source, query, client) for source in sources
+        ])
 
-        return sorted(results, key=lambda x: x.score, reverse=True)
+        results = [r for outcome in outcomes if outcome for r in outcome]
+        succeeded = sum(1 for outcome in outcomes if outcome is not None)
+        metrics = ScrapingMetrics(
+            total_items=len(results),
+            sources_checked=[s.value for s in sources],
+            time_taken=round(time.perf_counter() - started, 4),
+            success_rate=round(succeeded / len(sources), 4) if sources else 0.0
+        )
+        return sorted(results, key=lambda x: x.score, reverse=True), metrics
+
+    def _scrape_sync(self, query: str, sources: List[DataSource] = None) -> tuple:
+        """Run scrape_sources from synchronous code with a short-lived client"""
+        async def run():
+            # Its own client, so the pooled one used by async callers is left alone
+            client = create_http_client(timeout=self.source_timeout)
+            try:
+                return await self.scrape_sources(query, sources, client)
+            finally:
+                if client is not None:
+                    await client.aclose()
 
-    def get_comprehensive_analysis(self, code: str, query: str = None) -> dict:
-        """Generate comprehensive code analysis with metrics and scraped data"""
         try:
-            metrics = self.generate_demo_metrics(code)
-            security = self.generate_demo_security(code)
-            performance = self.generate_demo_performance(code)
-            
-            # Simulate web scraping for related content
-            scraped_data = self.simulate_web_scraping(query or "code patterns")
-            
-            analysis = CodeAnalysis(
-                explanation="Detailed analysis of code structure and patterns",
-                suggestions=[
-                    "Implement error handling",
-                    "Add input validation",
-                    "Improve documentation"
-                ],
-                metrics=metrics,
-                security=security,
-                performance=performance,
-                patterns=[
-                    CodePattern(
-                        name="Factory Pattern",
-                        description="Creates objects without exposing creation logic",
-                        examples=["class Factory:\n    def create(self):..."],
-                        use_cases=["UI Components", "Database Connections"]
-                    )
-                ],
-                timestamp=datetime.now()
-            )
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run())
+        # Called from async code: asyncio.run() needs a thread without a running loop
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, run()).result()
+
+    def simulate_web_scraping(self, query: str, sources: List[DataSource] = None) -> List[SearchResult]:
+        """Search multiple platforms for code examples and discussions"""
+        results, _ = self._scrape_sync(query, sources)
+        return results
+
+    def _build_comprehensive_analysis(self, code: str, scraped_data: List[SearchResult], scraping_metrics: ScrapingMetrics, language: str = None) -> dict:
+        language = language or detect_language(code)
+        metrics = self.generate_demo_metrics(code, language)
+        security = self.generate_demo_security(code)
+        performance = self.generate_demo_performance(code)
 
+        analysis = CodeAnalysis(
+            explanation="Detailed analysis of code structure and patterns",
+            suggestions=[
+                "Implement error handling",
+                "Add input validation",
+                "Improve documentation"
+            ],
+            metrics=metrics,
+            security=security,
+            performance=performance,
+            patterns=[
+                CodePattern(
+                    name="Factory Pattern",
+                    description="Creates objects without exposing creation logic",
+                    examples=["class Factory:\n    def create(self):..."],
+                    use_cases=["UI Components", "Database Connections"]
+                )
+            ],
+            timestamp=datetime.now()
+        )
+
+        with timed("serialize"):
             result = {
                 "status": "success",
                 "analysis": analysis.dict(),
                 "related_resources": [r.dict() for r in scraped_data[:5]],
-                "scraping_metrics": ScrapingMetrics(
-                    total_items=len(scraped_data),
-                    sources_checked=[s.value for s in DataSource],
-                    time_taken=random.uniform(0.5, 2.0),
-                    success_rate=0.95
-                ).dict()
+                "scraping_metrics": scraping_metrics.dict()
             }
 
-            self.analysis_history.append(result)
-            return result
+        self.analysis_history.append(result, language=language)
+        return result
+
+    def get_comprehensive_analysis(self, code: str, query: str = None, language: str = None) -> dict:
+        """Generate comprehensive code analysis with metrics and scraped data"""
+        try:
+            scraped_data, scraping_metrics = self._scrape_sync(query or "code patterns")
+            return self._build_comprehensive_analysis(code, scraped_data, scraping_metrics, language)
 
         except Exception as e:
             return {
@@ -268,16 +802,40 @@ class CodeAnalyticsService:
                 "response": f"Analysis failed: {str(e)}"
             }
 
-    def get_analysis_history(self) -> List[dict]:
-        """Get history of all analyses performed"""
-        return self.analysis_history
+    async def get_comprehensive_analysis_async(self, code: str, query: str = None, language: str = None) -> dict:
+        """Async variant of get_comprehensive_analysis for use inside the event loop"""
+        try:
+            scraped_data, scraping_metrics = await self.scrape_sources(query or "code patterns")
+            return self._build_comprehensive_analysis(code, scraped_data, scraping_metrics, language)
 
-    def export_report(self, format: str = "json") -> Union[str, dict]:
-        """Export analysis history in specified format"""
+        except Exception as e:
+            return {
+                "status": "error",
+                "response": f"Analysis failed: {str(e)}"
+            }
+
+    def get_analysis_history(self, offset: int = 0, limit: int = 50, since: Union[datetime, float] = None, until: Union[datetime, float] = None, language: str = None) -> List[dict]:
+        """Get one page of past analyses, newest first, optionally filtered by time and language"""
+        return self.analysis_history.query(offset=offset, limit=limit, since=since, until=until, language=language)
+
+    def export_report(self, format: str = "json", since: Union[datetime, float] = None, until: Union[datetime, float] = None, language: str = None) -> Union[str, dict, Iterator[str]]:
+        """
+        Export analysis history in specified format.
+
+        "ndjson" and "csv" return an iterator of lines that reads the store in
+        batches, so large histories are never held in memory at once. "json"
+        builds a single document and is only suited to small exports.
+        """
+        filters = {"since": since, "until": until, "language": language}
+        if format == "ndjson":
+            return self.analysis_history.export_ndjson(**filters)
+        if format == "csv":
+            return self.analysis_history.export_csv(**filters)
         if format == "json":
+            analyses = [entry["result"] for entry in self.analysis_history.iter_entries(**filters)]
             return {
-                "analyses": self.analysis_history,
+                "analyses": analyses,
                 "generated_at": datetime.now().isoformat(),
-                "total_analyses": len(self.analysis_history)
+                "total_analyses": len(analyses)
             }
         return "Unsupported format"
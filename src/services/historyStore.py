@@ -0,0 +1,209 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Union, Any, Iterator
+import csv
+import io
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+TimeBound = Union[datetime, float, None]
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    "id", "recorded_at", "language", "status", "lines_of_code", "complexity",
+    "maintainability_index", "security_score", "related_resources"
+]
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_epoch(value: TimeBound) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def _log_write_failure(future: Future) -> None:
+    if future.exception() is not None:
+        logger.warning("Analysis history write failed: %s", future.exception())
+
+
+class AnalysisHistory:
+    """
+    Append-only analysis history.
+
+    Only the most recent buffer_size entries are kept in memory. With a path,
+    every entry is also appended to a SQLite file by a background writer;
+    pages that fall within the ring buffer are served from memory, older ones
+    and exports from the file. Without a path, history is limited to the ring
+    buffer.
+    """
+
+    def __init__(self, path: str = None, buffer_size: int = 100):
+        self.path = path
+        self._recent = deque(maxlen=buffer_size)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, recorded_at REAL NOT NULL, "
+                "language TEXT, status TEXT, result TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analyses_recorded_at ON analyses (recorded_at)")
+            # Ids are assigned up front so appends need not wait for the insert
+            self._next_id = self._db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM analyses").fetchone()[0]
+            # One writer keeps inserts in order and off the caller's thread
+            self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-history-write")
+
+    def append(self, result: Dict[str, Any], language: str = None) -> None:
+        """Record in memory now; the SQLite insert happens in the background, in order"""
+        entry = {"recorded_at": time.time(), "language": language, "result": result}
+        with self._lock:
+            entry = {"id": self._next_id, **entry}
+            self._next_id += 1
+            self._recent.append(entry)
+        if self._db is not None:
+            self._write_executor.submit(self._insert, entry).add_done_callback(_log_write_failure)
+
+    def _insert(self, entry: Dict[str, Any]) -> None:
+        result = entry["result"]
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO analyses (id, recorded_at, language, status, result) VALUES (?, ?, ?, ?, ?)",
+                (entry["id"], entry["recorded_at"], entry["language"], result.get("status"),
+                 json.dumps(result, default=_json_default))
+            )
+
+    def flush(self) -> None:
+        """Wait until every appended entry has been written to the SQLite file"""
+        if self._db is not None:
+            self._write_executor.submit(lambda: None).result()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _where(self, since: TimeBound, until: TimeBound, language: Optional[str], after_id: int = None) -> tuple:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("recorded_at >= ?")
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append("recorded_at < ?")
+            params.append(_to_epoch(until))
+        if language:
+            clauses.append("language = ?")
+            params.append(language)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _matches(self, entry: Dict[str, Any], since: TimeBound, until: TimeBound, language: Optional[str]) -> bool:
+        since, until = _to_epoch(since), _to_epoch(until)
+        return (
+            (since is None or entry["recorded_at"] >= since)
+            and (until is None or entry["recorded_at"] < until)
+            and (not language or entry["language"] == language)
+        )
+
+    def count(self, since: TimeBound = None, until: TimeBound = None, language: str = None) -> int:
+        if self._db is None:
+            with self._lock:
+                return sum(1 for entry in self._recent if self._matches(entry, since, until, language))
+        self.flush()
+        where, params = self._where(since, until, language)
+        with self._db_lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def query(self, offset: int = 0, limit: int = 50, since: TimeBound = None, until: TimeBound = None, language: str = None) -> List[Dict[str, Any]]:
+        """One page of entries, newest first"""
+        with self._lock:
+            matching = [e for e in reversed(self._recent) if self._matches(e, since, until, language)]
+        # The buffer holds the newest entries, so a page it fully covers is the same as on disk
+        if self._db is None or len(matching) >= offset + limit:
+            return matching[offset:offset + limit]
+
+        self.flush()
+        where, params = self._where(since, until, language)
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT id, recorded_at, language, result FROM analyses{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [
+            {"id": row[0], "recorded_at": row[1], "language": row[2], "result": json.loads(row[3])}
+            for row in rows
+        ]
+
+    def iter_entries(self, since: TimeBound = None, until: TimeBound = None, language: str = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Every matching entry, oldest first, fetched in batches"""
+        if self._db is None:
+            with self._lock:
+                entries = [e for e in self._recent if self._matches(e, since, until, language)]
+            yield from entries
+            return
+
+        self.flush()
+        last_id = 0
+        while True:
+            where, params = self._where(since, until, language, after_id=last_id)
+            with self._db_lock:
+                rows = self._db.execute(
+                    f"SELECT id, recorded_at, language, result FROM analyses{where} ORDER BY id LIMIT ?",
+                    params + [batch_size]
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {"id": row[0], "recorded_at": row[1], "language": row[2], "result": json.loads(row[3])}
+            last_id = rows[-1][0]
+
+    def export_ndjson(self, **filters) -> Iterator[str]:
+        """One JSON document per line"""
+        for entry in self.iter_entries(**filters):
+            yield json.dumps(entry, default=_json_default) + "\n"
+
+    def export_csv(self, **filters) -> Iterator[str]:
+        """Header line followed by one summary row per entry"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush() -> str:
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return line
+
+        writer.writerow(CSV_COLUMNS)
+        yield flush()
+        for entry in self.iter_entries(**filters):
+            result = entry["result"]
+            analysis = result.get("analysis") or {}
+            metrics = analysis.get("metrics") or {}
+            security = analysis.get("security") or {}
+            writer.writerow([
+                entry["id"],
+                datetime.fromtimestamp(entry["recorded_at"]).isoformat(),
+                entry["language"] or "",
+                result.get("status", ""),
+                metrics.get("lines_of_code", ""),
+                metrics.get("complexity", ""),
+                metrics.get("maintainability_index", ""),
+                security.get("security_score", ""),
+                len(result.get("related_resources", []))
+            ])
+            yield flush()
@@ -0,0 +1,280 @@
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+
+from src.services.instrumentation import record_stage
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# HTTP statuses worth retrying: rate limited, overloaded or transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "BadGateway", "GatewayTimeout"
+}
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+# Client errors without a status attribute still lead their message with it, e.g. "429 Resource has been exhausted"
+_RATE_LIMIT_MESSAGE_RE = re.compile(r"^\s*429\b")
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    for attribute in ("code", "status_code"):
+        value = getattr(exc, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """True for quota / 429 errors from the model client"""
+    return (
+        _status_code(exc) == 429
+        or type(exc).__name__ in RATE_LIMIT_ERRORS
+        or _RATE_LIMIT_MESSAGE_RE.match(str(exc)) is not None
+    )
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    return (
+        _status_code(exc) in RETRYABLE_STATUS
+        or type(exc).__name__ in RETRYABLE_ERRORS
+        or is_rate_limit_error(exc)
+    )
+
+
+class TokenBucket:
+    """Continuously refilling bucket; rate is units per minute"""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)"""
+        self._refill(now)
+        # Requests larger than the bucket are admitted once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+class ModelScheduler:
+    """
+    Admission control in front of the model client.
+
+    - Concurrency: at most max_concurrency calls run at once.
+    - Quota: optional requests-per-minute and tokens-per-minute buckets.
+    - Priority: waiters are admitted strictly by priority, then arrival order,
+      so interactive requests overtake queued batch work.
+    - Single-flight: calls sharing a key while one is in flight share its result.
+    - Retries: retryable errors (429/5xx) back off exponentially with full jitter,
+      releasing their slot while they wait.
+    """
+
+    def __init__(self, max_concurrency: int = 32, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_max: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._timer = None
+        self._flights: Dict[Any, list] = {}
+        self._waits = deque(maxlen=1000)
+        self._counters = {
+            "admitted": 0,
+            "coalesced": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0
+        }
+
+    def _quota_wait(self, tokens: int, now: float) -> float:
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.wait_time(1, now))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.wait_time(tokens, now))
+        return wait
+
+    def _dispatch(self) -> None:
+        """Admit queued waiters while concurrency and quota allow"""
+        while self._queue:
+            priority, _, tokens, future, enqueued_at = self._queue[0]
+            if future.done():
+                # Waiter gave up (cancelled or timed out)
+                heapq.heappop(self._queue)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                return
+            now = time.monotonic()
+            wait = self._quota_wait(tokens, now)
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._queue)
+            if self.request_bucket:
+                self.request_bucket.consume(1, now)
+            if self.token_bucket:
+                self.token_bucket.consume(tokens, now)
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            self._waits.append(now - enqueued_at)
+            future.set_result(now - enqueued_at)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 1) -> float:
+        """Wait for a slot; returns the time spent queued. Pair with release()."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), tokens, future, time.monotonic()))
+        self._dispatch()
+        try:
+            waited = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled; hand the slot back
+                self.release()
+            raise
+        record_stage("queue_wait", waited)
+        return waited
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _should_retry(self, e: Exception, attempt: int) -> bool:
+        """Count a failed attempt and decide whether to try again"""
+        if is_rate_limit_error(e):
+            self._counters["rate_limited"] += 1
+        if attempt >= self.max_retries or not is_retryable_error(e):
+            self._counters["failures"] += 1
+            return False
+        self._counters["retries"] += 1
+        return True
+
+    async def _execute(self, call: Callable[[], Awaitable], priority: int, tokens: int):
+        attempt = 0
+        while True:
+            await self.acquire(priority, tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            finally:
+                self.release()
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def open_stream(self, open_stream: Callable[[], AsyncIterator], priority: int = PRIORITY_INTERACTIVE,
+                          tokens: int = 1) -> Tuple[AsyncIterator, List[Any]]:
+        """
+        Open a stream under the scheduler and wait for its first item.
+
+        Errors before the first item are retried like run(); once output has
+        reached the caller a retry would repeat it, so later errors are the
+        caller's to handle. Returns the stream and the items received so far
+        (the first one, or none for an empty stream) while still holding the
+        slot; pair with release().
+        """
+        attempt = 0
+        while True:
+            await self.acquire(priority, tokens)
+            stream = None
+            try:
+                stream = open_stream()
+                try:
+                    return stream, [await stream.__anext__()]
+                except StopAsyncIteration:
+                    return stream, []
+            except BaseException as e:
+                if stream is not None:
+                    await stream.aclose()
+                self.release()
+                if not isinstance(e, Exception) or not self._should_retry(e, attempt):
+                    raise
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def run(self, call: Callable[[], Awaitable], priority: int = PRIORITY_INTERACTIVE, tokens: int = 1, key: Any = None):
+        """
+        Run call() under the scheduler.
+
+        Callers passing the same key while a call is in flight share its
+        result. The shared call is only cancelled once every caller has gone.
+        """
+        if key is None:
+            return await self._execute(call, priority, tokens)
+
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._execute(call, priority, tokens))
+            flight = [task, 0]
+            self._flights[key] = flight
+            task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+        else:
+            self._counters["coalesced"] += 1
+
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future, _ in self._queue:
+            if not future.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                depth[name] = depth.get(name, 0) + 1
+
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 2)
+
+        return {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "in_flight_keys": len(self._flights),
+            "queue_depth": depth,
+            "wait_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0
+            }
+        }
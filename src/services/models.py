@@ -0,0 +1,83 @@
+from pydantic import BaseModel
+from typing import List, Dict, Optional, Any
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+class CodeLanguage(Enum):
+    PYTHON = "python"
+    TYPESCRIPT = "typescript"
+    JAVASCRIPT = "javascript"
+    REACT = "react"
+    HTML = "html"
+    CSS = "css"
+
+class CodeAnalysisLevel(Enum):
+    BASIC = "basic"
+    INTERMEDIATE = "intermediate"
+    ADVANCED = "advanced"
+    EXPERT = "expert"
+
+@dataclass
+class ScrapedData:
+    source: str
+    timestamp: datetime
+    data: Any
+    metadata: Dict[str, Any]
+
+class DataSource(Enum):
+    GITHUB = "github"
+    STACKOVERFLOW = "stackoverflow"
+    NPM = "npm"
+    PYPI = "pypi"
+    DEV_TO = "dev.to"
+    MEDIUM = "medium"
+
+class CodeMetrics(BaseModel):
+    lines_of_code: int
+    complexity: float
+    maintainability_index: float
+    code_smells: List[str]
+    suggestions: List[str]
+    halstead_volume: float = 0.0
+    nesting_depth: int = 0
+    functions: List[Dict[str, Any]] = []
+
+class SecurityAnalysis(BaseModel):
+    vulnerabilities: List[Dict[str, str]]
+    security_score: float
+    recommendations: List[str]
+
+class PerformanceMetrics(BaseModel):
+    time_complexity: str
+    space_complexity: str
+    optimization_tips: List[str]
+
+class CodePattern(BaseModel):
+    name: str
+    description: str
+    examples: List[str]
+    use_cases: List[str]
+
+class ScrapingMetrics(BaseModel):
+    total_items: int
+    sources_checked: List[str]
+    time_taken: float
+    success_rate: float
+
+class SearchResult(BaseModel):
+    title: str
+    url: str
+    description: str
+    source: str
+    score: float
+    last_updated: datetime
+
+class CodeAnalysis(BaseModel):
+    explanation: str
+    suggestions: List[str]
+    metrics: Optional[CodeMetrics]
+    security: Optional[SecurityAnalysis]
+    performance: Optional[PerformanceMetrics]
+    patterns: List[CodePattern]
+    timestamp: datetime
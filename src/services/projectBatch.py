@@ -0,0 +1,101 @@
+from typing import List, Dict, Tuple, Any
+from dataclasses import dataclass
+import hashlib
+import re
+
+from src.services.promptBuilder import estimate_tokens
+
+# Prompt text wrapped around every chunk, in estimated tokens
+CHUNK_OVERHEAD_TOKENS = 200
+
+FILE_HEADER_RE = re.compile(r"^#{2,4}\s*FILE:\s*`?([^`\n]+?)`?\s*$", re.MULTILINE)
+
+
+@dataclass
+class ProjectFile:
+    path: str
+    content: str
+    digest: str
+    tokens: int
+
+
+def flatten_files(tree: List[Dict[str, Any]], parent: str = "") -> List[Tuple[str, str]]:
+    """(path, content) for every file in a FileStructure tree"""
+    files = []
+    for node in tree:
+        name = node.get("name", "")
+        path = node.get("path") or (f"{parent}/{name}" if parent else name)
+        children = node.get("children")
+        if children:
+            files.extend(flatten_files(children, path))
+        elif node.get("type") == "file" or node.get("content") is not None:
+            files.append((path, node.get("content") or ""))
+    return files
+
+
+def dedupe_files(files: List[Tuple[str, str]]) -> Tuple[List[ProjectFile], Dict[str, str]]:
+    """
+    Drop byte-identical files.
+
+    Returns the unique files and a map from each duplicate's path to the
+    path of the first file with the same content.
+    """
+    unique, duplicates, seen = [], {}, {}
+    for path, content in files:
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if digest in seen:
+            duplicates[path] = seen[digest]
+            continue
+        seen[digest] = path
+        unique.append(ProjectFile(path, content, digest, estimate_tokens(content)))
+    return unique, duplicates
+
+
+def pack_chunks(files: List[ProjectFile], token_budget: int) -> List[List[ProjectFile]]:
+    """
+    Pack files into as few prompts as fit the budget (first-fit decreasing).
+
+    A file larger than the budget on its own gets a chunk to itself.
+    """
+    capacity = max(token_budget - CHUNK_OVERHEAD_TOKENS, 1)
+    chunks: List[List[ProjectFile]] = []
+    remaining: List[int] = []
+    for file in sorted(files, key=lambda f: f.tokens, reverse=True):
+        for index, space in enumerate(remaining):
+            if file.tokens <= space:
+                chunks[index].append(file)
+                remaining[index] -= file.tokens
+                break
+        else:
+            chunks.append([file])
+            remaining.append(capacity - file.tokens)
+    return chunks
+
+
+def build_batch_prompt(chunk: List[ProjectFile], query: str) -> str:
+    sections = "\n".join(
+        f"### FILE: {file.path}\n```\n{file.content}\n```" for file in chunk
+    )
+    return (
+        "You are reviewing several files from one project.\n"
+        f"Query: {query}\n"
+        "Answer the query separately for each file. Start each answer with a line "
+        "of the form `### FILE: <path>` using the exact path given below, and do "
+        "not add any other text outside those sections.\n\n"
+        f"{sections}"
+    )
+
+
+def split_batch_response(text: str, paths: List[str]) -> Dict[str, str]:
+    """Split a batch response into per-file answers keyed by path"""
+    answers = {}
+    matches = list(FILE_HEADER_RE.finditer(text))
+    for index, match in enumerate(matches):
+        path = match.group(1).strip()
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        if path in paths:
+            answers[path] = text[match.end():end].strip()
+    if len(paths) == 1 and paths[0] not in answers:
+        # A lone file's answer is the whole response, whatever header the model wrote
+        answers[paths[0]] = FILE_HEADER_RE.sub("", text).strip()
+    return answers
@@ -0,0 +1,242 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
+import ast
+import io
+import re
+import tokenize
+
+from src.services.staticMetrics import detect_language, extract_functions
+
+STRATEGIES = ("strip_comments", "extract_regions", "collapse_bodies")
+
+# Lines kept around each use of a query symbol that has no enclosing function
+REGION_CONTEXT_LINES = 5
+
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_$][\w$]*")
+_JS_STRING_OR_COMMENT_RE = re.compile(
+    r"""(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"""
+    r"""|(?P<comment>//[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<regex>/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*)""",
+    re.DOTALL
+)
+# Keywords after which a `/` starts a regex literal rather than a division
+_JS_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else", "yield", "await"}
+_JS_CLASS_RE = re.compile(r"\bclass\s+([A-Za-z_$][\w$]*)")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local approximation of a BPE token count.
+
+    Letter runs cost roughly one token per four characters, digit runs one
+    per three, and every punctuation character one; whitespace is free.
+    """
+    total = 0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            total += (len(piece) + 3) // 4
+        elif first.isdigit():
+            total += (len(piece) + 2) // 3
+        else:
+            total += 1
+    return total
+
+
+@dataclass
+class CompactionResult:
+    code: str
+    original_tokens: int
+    compacted_tokens: int
+    strategies: List[str] = field(default_factory=list)
+
+
+def _drop_blank_lines(lines: List[str], in_strings: Set[int]) -> str:
+    """Drop lines left blank, except those (0-based) inside multi-line strings"""
+    return "\n".join(line for index, line in enumerate(lines) if line.strip() or index in in_strings)
+
+
+def _is_division(code: str, slash: int) -> bool:
+    """Whether the `/` at this offset follows an operand, making it a division"""
+    end = slash
+    while end and code[end - 1] in " \t":
+        end -= 1
+    if not end or code[end - 1] in ")]":
+        return bool(end)
+    start = end
+    while start and (code[start - 1].isalnum() or code[start - 1] in "_$"):
+        start -= 1
+    return start < end and code[start:end] not in _JS_REGEX_KEYWORDS
+
+
+def strip_comments(code: str, language: str) -> str:
+    """Remove comments and blank lines, leaving strings and regex literals untouched"""
+    if language != "python":
+        parts, in_strings, line, position, search_from = [], set(), 0, 0, 0
+        while True:
+            match = _JS_STRING_OR_COMMENT_RE.search(code, search_from)
+            if not match:
+                break
+            if match.group("regex") and _is_division(code, match.start()):
+                search_from = match.start() + 1
+                continue
+            parts.append(code[position:match.start()])
+            line += code.count("\n", position, match.start())
+            string = match.group("string") or match.group("regex")
+            if string:
+                parts.append(string)
+                # Template literals may span lines; every line after the opening one is string content
+                newlines = string.count("\n")
+                in_strings.update(range(line + 1, line + newlines + 1))
+                line += newlines
+            else:
+                line += match.group().count("\n")
+            position = search_from = match.end()
+        parts.append(code[position:])
+        return _drop_blank_lines("".join(parts).splitlines(), in_strings)
+
+    lines = code.splitlines()
+    in_strings = set()
+    fstring_starts = []
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type == tokenize.COMMENT:
+            row, column = token.start
+            lines[row - 1] = lines[row - 1][:column].rstrip()
+        elif token.type == tokenize.STRING:
+            in_strings.update(range(token.start[0], token.end[0]))
+        elif token.type == getattr(tokenize, "FSTRING_START", None):
+            fstring_starts.append(token.start[0])
+        elif token.type == getattr(tokenize, "FSTRING_END", None):
+            in_strings.update(range(fstring_starts.pop(), token.end[0]))
+    return _drop_blank_lines(lines, in_strings)
+
+
+def query_symbols(code: str, query: str, language: str) -> Set[str]:
+    """Function and class names defined in code that the query mentions"""
+    words = set(_IDENTIFIER_RE.findall(query or ""))
+    if not words:
+        return set()
+    defined = {function.name for function in extract_functions(code, language)}
+    if language == "python":
+        defined |= {node.name for node in ast.walk(ast.parse(code)) if isinstance(node, ast.ClassDef)}
+    else:
+        defined |= set(_JS_CLASS_RE.findall(code))
+    return words & defined
+
+
+def _outermost(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Drop ranges nested inside an earlier one; input sorted by start line"""
+    kept = []
+    for start, end in ranges:
+        if kept and start <= kept[-1][1]:
+            continue
+        kept.append((start, end))
+    return kept
+
+
+def collapse_bodies(code: str, language: str, symbols: Set[str]) -> str:
+    """Replace the bodies of functions not named by the query with a placeholder"""
+    lines = code.splitlines()
+    collapses = []
+    if language == "python":
+        for node in ast.walk(ast.parse(code)):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name not in symbols:
+                body_start = node.body[0].lineno
+                if body_start > node.lineno:
+                    indent = " " * node.body[0].col_offset
+                    collapses.append((body_start, node.end_lineno, f"{indent}..."))
+    else:
+        for function in extract_functions(code, language):
+            # Keep everything up to the body's `{`: parameters and return type may span lines
+            if function.name not in symbols and function.end_line - function.body_line > 1:
+                first = lines[function.body_line]
+                indent = first[:len(first) - len(first.lstrip())]
+                collapses.append((function.body_line + 1, function.end_line - 1, f"{indent}/* ... */"))
+
+    kept = _outermost(sorted((start, end) for start, end, _ in collapses))
+    placeholders = {(start, end): text for start, end, text in collapses}
+    for start, end in reversed(kept):
+        lines[start - 1:end] = [placeholders[(start, end)]]
+    return "\n".join(lines)
+
+
+def extract_regions(code: str, language: str, symbols: Set[str]) -> Optional[str]:
+    """Keep only the definitions of query symbols (or lines around their uses)"""
+    if not symbols:
+        return None
+    lines = code.splitlines()
+    ranges = []
+    if language == "python":
+        for node in ast.walk(ast.parse(code)):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in symbols:
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                ranges.append((start, node.end_lineno))
+    else:
+        for function in extract_functions(code, language):
+            if function.name in symbols:
+                ranges.append((function.start_line, function.end_line))
+    if not ranges:
+        pattern = re.compile(r"\b(" + "|".join(map(re.escape, symbols)) + r")\b")
+        for number, line in enumerate(lines, 1):
+            if pattern.search(line):
+                ranges.append((max(1, number - REGION_CONTEXT_LINES), min(len(lines), number + REGION_CONTEXT_LINES)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return "\n...\n".join("\n".join(lines[start - 1:end]) for start, end in merged)
+
+
+class PromptBuilder:
+    """
+    Shrinks code that would push a prompt over max_tokens.
+
+    Strategies run in the configured order and stop as soon as the code
+    fits; code already under budget is passed through untouched.
+    """
+
+    def __init__(self, max_tokens: int = 8000, strategies: List[str] = None):
+        self.max_tokens = max_tokens
+        self.strategies = [s for s in (strategies or list(STRATEGIES)) if s in STRATEGIES]
+
+    @property
+    def config_key(self) -> str:
+        """Identifies settings that change prompts, for cache keys"""
+        return f"{self.max_tokens}:{','.join(self.strategies)}"
+
+    def compact(self, code: str, query: str = None, language: str = None) -> CompactionResult:
+        original_tokens = estimate_tokens(code)
+        result = CompactionResult(code, original_tokens, original_tokens)
+        if not code or original_tokens <= self.max_tokens:
+            return result
+
+        language = language or detect_language(code)
+        if language != "python":
+            language = "javascript"
+        try:
+            symbols = query_symbols(code, query, language)
+        except SyntaxError:
+            symbols = set()
+
+        for strategy in self.strategies:
+            try:
+                if strategy == "strip_comments":
+                    compacted = strip_comments(result.code, language)
+                elif strategy == "extract_regions":
+                    compacted = extract_regions(result.code, language, symbols)
+                else:
+                    compacted = collapse_bodies(result.code, language, symbols)
+            except (SyntaxError, tokenize.TokenError, IndentationError):
+                continue
+            if compacted is None or compacted == result.code:
+                continue
+            result.code = compacted
+            result.compacted_tokens = estimate_tokens(compacted)
+            result.strategies.append(strategy)
+            if result.compacted_tokens <= self.max_tokens:
+                break
+        return result
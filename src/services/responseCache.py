@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_code(code: Optional[str]) -> str:
+    """Normalize code so whitespace-only edits map to the same cache entry"""
+    if not code:
+        return ""
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+
+def make_cache_key(code: Optional[str], query: Optional[str], model_name: str, prompt_version: str) -> str:
+    """Content-addressed key for a single analysis request"""
+    payload = json.dumps(
+        [normalize_code(code), (query or "").strip(), model_name, prompt_version],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _log_write_failure(future: Future) -> None:
+    if future.exception() is not None:
+        logger.warning("Response cache disk write failed: %s", future.exception())
+
+
+class ResponseCache:
+    """
+    Two-tier cache for JSON-serializable responses.
+
+    The memory tier is a bounded LRU with per-entry TTL. The optional disk
+    tier is a SQLite file that survives restarts and can be shared by several
+    worker processes; disk hits are promoted back into memory.
+
+    get/set may block on disk I/O. Async callers use aget/aset, which run
+    disk access on a dedicated thread so SQLite contention never stalls the
+    event loop.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, path: str = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "sets": 0
+        }
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        if path:
+            self._db = self._connect(path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # Under WAL readers never wait for writers, so reads get their own
+            # connection and thread rather than queueing behind a busy write
+            self._reader = self._connect(path)
+            self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache-read")
+            # One writer thread keeps disk writes in order and off the event loop
+            self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache-write")
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        return sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+            if self._db is None:
+                self._counters["misses"] += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._reader_lock:
+            row = self._reader.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        with self._lock:
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            value = json.loads(row[0])
+            self._store_in_memory(key, value, row[1])
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            return value
+
+    def _set_disk(self, key: str, value: Dict[str, Any], expires_at: float, prune: bool) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            # Prune expired rows now and then rather than on every write
+            if prune:
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    def _set_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> bool:
+        """Store in memory; returns whether this write should also prune the disk tier"""
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+            self._counters["sets"] += 1
+            return self._counters["sets"] % 100 == 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._db is not None:
+            value = self._get_disk(key, now)
+        return value
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._db is not None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(self._read_executor, self._get_disk, key, now)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        prune = self._set_memory(key, value, expires_at)
+        if self._db is not None:
+            self._set_disk(key, value, expires_at, prune)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """Store in memory now; the disk write happens in the background, in order"""
+        expires_at = time.time() + self.ttl
+        prune = self._set_memory(key, value, expires_at)
+        if self._db is not None:
+            future = self._write_executor.submit(self._set_disk, key, value, expires_at, prune)
+            future.add_done_callback(_log_write_failure)
+
+    def _store_in_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None
+            }
@@ -0,0 +1,440 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Tuple, Iterable, Iterator
+import ast
+import hashlib
+import os
+import re
+import threading
+
+from src.services.staticMetrics import PARALLEL_SCAN_THRESHOLD, detect_language
+
+SEVERITY_WEIGHTS = {"high": 2.5, "medium": 1.0, "low": 0.25}
+
+
+@dataclass(frozen=True)
+class SecurityRule:
+    """
+    A regular-expression rule.
+
+    keywords are literals, one of which occurs on the line where every match
+    starts; the rule only runs from those lines (an empty tuple runs it over
+    the whole file). Lowercase keywords match in any case, others exactly, so
+    prefer the most distinctive literal the pattern requires. languages limits
+    the rule to those languages; an empty tuple applies it to every file.
+    Patterns must not use global inline flags (use scoped groups such as
+    (?i:...)) since they are embedded in a larger regex.
+    """
+    id: str
+    title: str
+    severity: str
+    pattern: str
+    recommendation: str
+    languages: Tuple[str, ...] = ()
+    keywords: Tuple[str, ...] = ()
+    secret: bool = False
+
+
+_SECRET_ADVICE = "Move secrets to environment variables or a secret manager and rotate the exposed credential"
+
+RULES: List[SecurityRule] = [
+    # Secrets and API keys
+    SecurityRule("google-api-key", "Hardcoded Google API key", "high", r"AIza[0-9A-Za-z_\-]{35}", _SECRET_ADVICE, keywords=('AIza',), secret=True),
+    SecurityRule("aws-access-key-id", "Hardcoded AWS access key ID", "high", r"\b(?:A3T[A-Z0-9]|AKIA|ASIA|ABIA|ACCA)[A-Z2-7]{16}\b", _SECRET_ADVICE, keywords=('A3T', 'AKIA', 'ASIA', 'ABIA', 'ACCA'), secret=True),
+    SecurityRule("aws-secret-access-key", "Hardcoded AWS secret access key", "high", r"(?i:aws_?secret_?access_?key)\s*[:=]\s*['\"][0-9A-Za-z/+]{40}['\"]", _SECRET_ADVICE, keywords=('aws',), secret=True),
+    SecurityRule("github-token", "Hardcoded GitHub token", "high", r"\bgh[pousr]_[A-Za-z0-9]{36,255}\b", _SECRET_ADVICE, keywords=('ghp_', 'gho_', 'ghu_', 'ghs_', 'ghr_'), secret=True),
+    SecurityRule("github-fine-grained-token", "Hardcoded GitHub token", "high", r"\bgithub_pat_[A-Za-z0-9_]{82}\b", _SECRET_ADVICE, keywords=('github_pat_',), secret=True),
+    SecurityRule("gitlab-token", "Hardcoded GitLab token", "high", r"\bglpat-[0-9A-Za-z_\-]{20}\b", _SECRET_ADVICE, keywords=('glpat-',), secret=True),
+    SecurityRule("slack-token", "Hardcoded Slack token", "high", r"\bxox[abprs]-[0-9A-Za-z\-]{10,}", _SECRET_ADVICE, keywords=('xoxa-', 'xoxb-', 'xoxp-', 'xoxr-', 'xoxs-'), secret=True),
+    SecurityRule("slack-webhook", "Hardcoded Slack webhook URL", "medium", r"https://hooks\.slack\.com/services/T[A-Z0-9]+/B[A-Z0-9]+/[A-Za-z0-9]+", _SECRET_ADVICE, keywords=('hooks.slack.com',), secret=True),
+    SecurityRule("stripe-secret-key", "Hardcoded Stripe secret key", "high", r"\b[rs]k_live_[0-9A-Za-z]{24,}\b", _SECRET_ADVICE, keywords=('sk_live_', 'rk_live_'), secret=True),
+    SecurityRule("openai-api-key", "Hardcoded OpenAI API key", "high", r"\bsk-(?:proj-)?[A-Za-z0-9_\-]{20,}T3BlbkFJ[A-Za-z0-9_\-]{20,}", _SECRET_ADVICE, keywords=('T3BlbkFJ',), secret=True),
+    SecurityRule("anthropic-api-key", "Hardcoded Anthropic API key", "high", r"\bsk-ant-[A-Za-z0-9_\-]{20,}", _SECRET_ADVICE, keywords=('sk-ant-',), secret=True),
+    SecurityRule("sendgrid-api-key", "Hardcoded SendGrid API key", "high", r"\bSG\.[\w\-]{22}\.[\w\-]{43}\b", _SECRET_ADVICE, keywords=('SG.',), secret=True),
+    SecurityRule("twilio-api-key", "Hardcoded Twilio API key", "high", r"\bSK[0-9a-fA-F]{32}\b", _SECRET_ADVICE, keywords=('SK',), secret=True),
+    SecurityRule("mailgun-api-key", "Hardcoded Mailgun API key", "high", r"\bkey-[0-9A-Za-z]{32}\b", _SECRET_ADVICE, keywords=('key-',), secret=True),
+    SecurityRule("npm-token", "Hardcoded npm token", "high", r"\bnpm_[A-Za-z0-9]{36}\b", _SECRET_ADVICE, keywords=('npm_',), secret=True),
+    SecurityRule("private-key", "Private key in source", "high", r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----", _SECRET_ADVICE, keywords=('PRIVATE KEY',), secret=True),
+    SecurityRule("jwt", "Hardcoded JSON Web Token", "medium", r"\beyJ[A-Za-z0-9_\-]{10,}\.eyJ[A-Za-z0-9_\-]{10,}\.[A-Za-z0-9_\-]{10,}", _SECRET_ADVICE, keywords=('eyJ',), secret=True),
+    SecurityRule("database-url-password", "Database URL with embedded password", "high", r"\b(?:postgres(?:ql)?|mysql|mongodb(?:\+srv)?|redis|amqp)://[^\s:'\"/]+:[^\s@'\"]+@", _SECRET_ADVICE, keywords=('postgres', 'mysql', 'mongodb', 'redis', 'amqp'), secret=True),
+    SecurityRule("generic-secret", "Hardcoded credential", "medium", r"(?i:\b(?:api[_\-]?key|secret[_\-]?key|client[_\-]?secret|access[_\-]?token|auth[_\-]?token|password|passwd)\b)['\"]?\s*[:=]\s*['\"][^'\"\s]{8,}['\"]", _SECRET_ADVICE, keywords=('api_key', 'api-key', 'apikey', 'secret_key', 'secret-key', 'secretkey', 'client_secret', 'client-secret', 'clientsecret', 'access_token', 'access-token', 'accesstoken', 'auth_token', 'auth-token', 'authtoken', 'password', 'passwd'), secret=True),
+
+    # TypeScript / JavaScript
+    SecurityRule("js-eval", "Code injection via eval", "high", r"(?<![\w$.])eval\s*\(", "Avoid eval; parse data with JSON.parse or use explicit logic", ("javascript", "typescript"), keywords=('eval',)),
+    SecurityRule("js-new-function", "Code injection via Function constructor", "high", r"\bnew\s+Function\s*\(", "Avoid constructing functions from strings", ("javascript", "typescript"), keywords=('Function',)),
+    SecurityRule("js-inner-html", "XSS via innerHTML", "medium", r"\.(?:inner|outer)HTML\s*\+?=(?!=)", "Use textContent or sanitize HTML before inserting it", ("javascript", "typescript"), keywords=('innerhtml', 'outerhtml')),
+    SecurityRule("js-dangerous-html", "XSS via dangerouslySetInnerHTML", "medium", r"\bdangerouslySetInnerHTML\b", "Sanitize HTML (e.g. with DOMPurify) before rendering it", ("javascript", "typescript"), keywords=('dangerouslySetInnerHTML',)),
+    SecurityRule("js-document-write", "XSS via document.write", "medium", r"\bdocument\.write(?:ln)?\s*\(", "Build DOM nodes instead of writing raw HTML", ("javascript", "typescript"), keywords=('document.write',)),
+    SecurityRule("js-child-process-exec", "Command injection via child_process.exec", "high", r"\b(?:exec|execSync)\s*\(\s*`[^`]*\$\{", "Use execFile/spawn with an argument list instead of interpolated shell commands", ("javascript", "typescript"), keywords=('exec',)),
+    SecurityRule("js-sql-template", "SQL injection via string interpolation", "high", r"\.(?:query|execute|raw)\s*\(\s*`(?i:\s*(?:select|insert|update|delete)\b)[^`]*\$\{", "Use parameterized queries", ("javascript", "typescript"), keywords=('.query', '.execute', '.raw')),
+    SecurityRule("js-tls-disabled", "TLS certificate verification disabled", "medium", r"\brejectUnauthorized\s*:\s*false\b|NODE_TLS_REJECT_UNAUTHORIZED['\"]?\s*\]?\s*=\s*['\"]?0", "Keep TLS certificate verification enabled", ("javascript", "typescript"), keywords=('rejectUnauthorized', 'NODE_TLS_REJECT_UNAUTHORIZED')),
+]
+
+_rules_lock = threading.Lock()
+# Part of every cache key, so registering a rule invalidates earlier results
+_rules_version = 0
+
+
+def register_rule(rule: SecurityRule) -> None:
+    """Add a rule; its keywords join the shared keyword index on the next scan"""
+    global _rules_version
+    with _rules_lock:
+        RULES.append(rule)
+        _rules_version += 1
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    A regex matching the longest of words at a position, shaped as a trie.
+
+    Branches at each node start with distinct characters, so the engine
+    rejects a position with one character test however many words there are;
+    a flat alternation would try each word in turn.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class _KeywordIndex:
+    """
+    Every rule keyword compiled into one pattern.
+
+    A single pass over a file finds each keyword occurrence, and with it the
+    rules that can match and where. Searching resumes one character after
+    each hit, so overlapping keywords are all seen; the pattern reports the
+    longest keyword at an offset, and shorter keywords that are a prefix of
+    it are recovered from the matched text.
+    """
+
+    def __init__(self, rules: Tuple[SecurityRule, ...]):
+        self.unkeyed = tuple(rule for rule in rules if not rule.keywords)
+        self.rules_by_keyword: Dict[str, List[SecurityRule]] = {}
+        for rule in rules:
+            for keyword in rule.keywords:
+                self.rules_by_keyword.setdefault(keyword, []).append(rule)
+
+        # Keywords whose lowercase spelling is a prefix of each lowercase keyword
+        lowered = {keyword.lower() for keyword in self.rules_by_keyword}
+        self.prefixes: Dict[str, List[str]] = {
+            word: [keyword for keyword in self.rules_by_keyword if word.startswith(keyword.lower())]
+            for word in lowered
+        }
+        pattern = _trie_pattern(lowered)
+        self.pattern = re.compile(pattern) if lowered else None
+        # For the rare text whose lowercase form has a different length, which would shift offsets
+        self.pattern_ignorecase = re.compile(pattern, re.IGNORECASE) if lowered else None
+
+    def hits(self, content: str, language: str) -> Dict[SecurityRule, List[int]]:
+        """Rules for this language with a keyword in content, and the start of each line holding one"""
+        lines: Dict[SecurityRule, List[int]] = {}
+        if self.pattern is None:
+            return lines
+        lowered = content.lower()
+        pattern = self.pattern
+        if len(lowered) != len(content):
+            lowered, pattern = content, self.pattern_ignorecase
+
+        position = 0
+        while True:
+            candidate = pattern.search(lowered, position)
+            if candidate is None:
+                break
+            position = candidate.start() + 1
+            text = content[candidate.start():candidate.end()]
+            line_start = content.rfind("\n", 0, candidate.start()) + 1
+            for keyword in self.prefixes.get(text.lower(), ()):
+                # Lowercase keywords match in any case, others only exactly
+                if not keyword.islower() and not text.startswith(keyword):
+                    continue
+                for rule in self.rules_by_keyword[keyword]:
+                    if rule.languages and language not in rule.languages:
+                        continue
+                    starts = lines.setdefault(rule, [])
+                    if not starts or starts[-1] != line_start:
+                        starts.append(line_start)
+        return lines
+
+
+@lru_cache(maxsize=256)
+def _keyword_index(rules: Tuple[SecurityRule, ...]) -> _KeywordIndex:
+    return _KeywordIndex(rules)
+
+
+@lru_cache(maxsize=1024)
+def _compile_rule(pattern: str) -> Tuple["re.Pattern", "re.Pattern"]:
+    """The rule itself, and a variant anchored at a position that finds its next match on that line"""
+    return re.compile(pattern), re.compile(r"[^\n]*?(" + pattern + ")")
+
+
+def _rule_matches(content: str, language: str, rules: Tuple[SecurityRule, ...]) -> Iterator[Tuple[SecurityRule, int, str]]:
+    """
+    Every (rule, offset, matched text), including overlapping matches of different rules.
+
+    Only rules with a keyword in the file run, and only from the lines where
+    their keywords occur, so the cost follows the number of keyword hits
+    rather than the number of registered rules.
+    """
+    index = _keyword_index(rules)
+    for rule in index.unkeyed:
+        if not rule.languages or language in rule.languages:
+            for match in _compile_rule(rule.pattern)[0].finditer(content):
+                yield rule, match.start(), match.group()
+
+    for rule, line_starts in index.hits(content, language).items():
+        on_line = _compile_rule(rule.pattern)[1]
+        last_end = 0
+        for line_start in line_starts:
+            line_end = content.find("\n", line_start)
+            if line_end < 0:
+                line_end = len(content)
+            position = max(line_start, last_end)
+            while position <= line_end:
+                match = on_line.match(content, position)
+                if match is None:
+                    break
+                yield rule, match.start(1), match.group(1)
+                # A rule matching again inside its own previous match (a sliding match) is reported once
+                last_end = position = max(match.end(1), match.start(1) + 1)
+
+
+def _redact(text: str) -> str:
+    return text[:8] + "..." if len(text) > 8 else "..."
+
+
+def _line_of(content: str, offset: int) -> int:
+    return content.count("\n", 0, offset) + 1
+
+
+# Python AST checks
+
+_SQL_METHODS = {"execute", "executemany", "executescript", "raw", "query"}
+_SHELL_FUNCTIONS = {"run", "call", "check_call", "check_output", "Popen", "getoutput", "getstatusoutput"}
+
+
+def _record_import(node: ast.AST, aliases: Dict[str, str]) -> None:
+    """Map local names to fully qualified ones, e.g. {"sp": "subprocess", "run": "subprocess.run"}"""
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            if alias.asname:
+                aliases[alias.asname] = alias.name
+    elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+        for alias in node.names:
+            aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+
+def _dotted_name(node: ast.AST, aliases: Dict[str, str]) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(aliases.get(node.id, node.id))
+    return ".".join(reversed(parts))
+
+
+def _is_dynamic_string(node: ast.AST) -> bool:
+    """f-strings, concatenation/% formatting and .format() calls"""
+    if isinstance(node, ast.JoinedStr):
+        return any(isinstance(value, ast.FormattedValue) for value in node.values)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return True
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format":
+        return True
+    return False
+
+
+def _keyword_is(call: ast.Call, name: str, value) -> bool:
+    return any(
+        keyword.arg == name and isinstance(keyword.value, ast.Constant) and keyword.value.value is value
+        for keyword in call.keywords
+    )
+
+
+def _python_findings(content: str) -> List[Tuple[str, str, str, int, str]]:
+    """(rule id, title, severity, line, recommendation) for dangerous Python calls"""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+
+    # One walk collects imports and calls; calls are resolved once all imports are known
+    aliases: Dict[str, str] = {}
+    calls = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            calls.append(node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            _record_import(node, aliases)
+
+    findings = []
+    for node in calls:
+        name = _dotted_name(node.func, aliases)
+        method = name.rsplit(".", 1)[-1]
+
+        if name in ("eval", "exec"):
+            findings.append(("py-eval", f"Code injection via {name}", "high", node.lineno,
+                             f"Avoid {name}; use ast.literal_eval or explicit logic"))
+        elif name.startswith("subprocess.") and method in _SHELL_FUNCTIONS and _keyword_is(node, "shell", True):
+            findings.append(("py-subprocess-shell", "Command injection via subprocess with shell=True", "high", node.lineno,
+                             "Pass an argument list and keep shell=False"))
+        elif name in ("os.system", "os.popen"):
+            findings.append(("py-os-system", f"Command injection via {name}", "medium", node.lineno,
+                             "Use subprocess with an argument list instead of a shell command"))
+        elif (method in _SQL_METHODS and isinstance(node.func, ast.Attribute) and len(node.args) == 1
+              and not node.keywords and _is_dynamic_string(node.args[0])):
+            # With bound parameters alongside, the formatting usually only splices in fixed SQL fragments
+            findings.append(("py-sql-string", "SQL injection via string-built query", "high", node.lineno,
+                             "Use parameterized queries"))
+        elif name in ("pickle.loads", "pickle.load", "marshal.loads", "marshal.load"):
+            findings.append(("py-deserialization", f"Insecure deserialization via {name}", "medium", node.lineno,
+                             "Do not unpickle untrusted data; use JSON or a schema-validated format"))
+        elif name == "yaml.load" and not any(keyword.arg == "Loader" for keyword in node.keywords):
+            findings.append(("py-yaml-load", "Unsafe YAML loading", "medium", node.lineno,
+                             "Use yaml.safe_load"))
+        elif name in ("hashlib.md5", "hashlib.sha1"):
+            findings.append(("py-weak-hash", f"Weak hash function {method}", "low", node.lineno,
+                             "Use SHA-256 or stronger, or a password hash such as bcrypt for credentials"))
+        elif name.startswith(("requests.", "httpx.")) and _keyword_is(node, "verify", False):
+            findings.append(("py-tls-disabled", "TLS certificate verification disabled", "medium", node.lineno,
+                             "Keep TLS certificate verification enabled"))
+    return findings
+
+
+def scan_content(content: str, path: str = None, rules: Tuple[SecurityRule, ...] = None) -> List[Dict[str, str]]:
+    """All findings for one file, in line order"""
+    if rules is None:
+        rules = tuple(RULES)
+    language = detect_language(content, path)
+    if language == "react":
+        language = "javascript"
+
+    findings = []
+    for rule, offset, text in _rule_matches(content, language, rules):
+        findings.append({
+            "type": rule.title,
+            "severity": rule.severity,
+            "rule": rule.id,
+            "line": str(_line_of(content, offset)),
+            "match": _redact(text) if rule.secret else text.strip()[:80],
+            "recommendation": rule.recommendation
+        })
+
+    if language == "python":
+        for rule_id, title, severity, line, recommendation in _python_findings(content):
+            findings.append({
+                "type": title,
+                "severity": severity,
+                "rule": rule_id,
+                "line": str(line),
+                "recommendation": recommendation
+            })
+
+    if path:
+        for finding in findings:
+            finding["file"] = path
+    return sorted(findings, key=lambda f: int(f["line"]))
+
+
+def _scan_job(items: List[Tuple[str, str]], rules: Tuple[SecurityRule, ...]) -> List[Tuple[str, List[Dict[str, str]]]]:
+    """Process-pool worker: scan a batch of (path, content) pairs"""
+    return [(path, scan_content(content, path, rules)) for path, content in items]
+
+
+def security_score(findings: Iterable[Dict[str, str]]) -> float:
+    """10 for a clean scan, minus a weight per finding by severity"""
+    penalty = sum(SEVERITY_WEIGHTS.get(finding["severity"], 0.5) for finding in findings)
+    return round(max(0.0, 10.0 - penalty), 2)
+
+
+def security_recommendations(findings: Iterable[Dict[str, str]]) -> List[str]:
+    seen = []
+    for finding in findings:
+        if finding["recommendation"] not in seen:
+            seen.append(finding["recommendation"])
+    return seen
+
+
+class SecurityScanner:
+    """
+    Scans files and whole projects.
+
+    Results are cached by content hash, so files that have not changed since
+    the last scan are skipped. Changed files are spread across a process pool
+    when there are enough of them to be worth it.
+    """
+
+    def __init__(self, max_cached_files: int = 4096, max_workers: int = None):
+        self.max_cached_files = max_cached_files
+        self.max_workers = max_workers
+        self._cache: Dict[str, List[Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(path: str, content: str) -> str:
+        # The path matters: language detection and reported file names depend on it
+        return hashlib.sha256(f"{_rules_version}\0{path}\0{content}".encode("utf-8")).hexdigest()
+
+    def _remember(self, digest: str, findings: List[Dict[str, str]]) -> None:
+        with self._lock:
+            if len(self._cache) >= self.max_cached_files:
+                # Drop the oldest entry (dicts keep insertion order)
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[digest] = findings
+
+    def scan(self, content: str, path: str = None) -> List[Dict[str, str]]:
+        digest = self._digest(path or "", content)
+        with self._lock:
+            cached = self._cache.get(digest)
+        if cached is not None:
+            return cached
+        findings = scan_content(content, path)
+        self._remember(digest, findings)
+        return findings
+
+    def scan_files(self, files: Dict[str, str], max_workers: int = None) -> Tuple[Dict[str, List[Dict[str, str]]], int]:
+        """
+        Scan many files.
+
+        Returns findings per path and how many files were skipped because
+        their content was unchanged since a previous scan.
+        """
+        digests = {path: self._digest(path, content) for path, content in files.items()}
+        results: Dict[str, List[Dict[str, str]]] = {}
+        changed: List[Tuple[str, str]] = []
+        with self._lock:
+            for path, content in files.items():
+                cached = self._cache.get(digests[path])
+                if cached is None:
+                    changed.append((path, content))
+                else:
+                    results[path] = cached
+
+        rules = tuple(RULES)
+        if len(changed) < PARALLEL_SCAN_THRESHOLD:
+            scanned = _scan_job(changed, rules)
+        else:
+            workers = max_workers or self.max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # A few batches per worker keeps pickling overhead low
+                batch_count = min(workers * 4, len(changed))
+                batches = [changed[index::batch_count] for index in range(batch_count)]
+                scanned = [item for batch in pool.map(_scan_job, batches, [rules] * len(batches)) for item in batch]
+
+        for path, findings in scanned:
+            self._remember(digests[path], findings)
+            results[path] = findings
+        return results, len(files) - len(changed)
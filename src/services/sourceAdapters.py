@@ -0,0 +1,253 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import xml.etree.ElementTree as ET
+import asyncio
+import re
+
+from src.services.models import DataSource, SearchResult
+
+try:
+    import httpx
+except ImportError:  # Only the offline stub adapters are usable without httpx
+    httpx = None
+
+
+def _parse_datetime(value: Optional[str]) -> datetime:
+    """Parse an ISO-8601 timestamp from an API response, defaulting to now"""
+    if not value:
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return datetime.now()
+
+
+def _rank_score(position: int, limit: int) -> float:
+    """Turn a source's own result ordering into a 0.5-1.0 relevance score"""
+    return round(1.0 - 0.5 * position / max(limit, 1), 2)
+
+
+def _first_term(query: str) -> str:
+    """Reduce a free-text query to a single tag/package-style term"""
+    match = re.search(r"[A-Za-z0-9][A-Za-z0-9_.-]*", query)
+    return match.group(0).lower() if match else ""
+
+
+class SourceAdapter(ABC):
+    """
+    Searches one DataSource for code examples and discussions.
+
+    Subclasses implement search(); client is the shared pooled HTTP client
+    (None for adapters that never touch the network).
+    """
+
+    requires_network = True
+
+    def __init__(self, source: DataSource, base_url: str):
+        self.source = source
+        self.base_url = base_url.rstrip("/")
+
+    @abstractmethod
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        ...
+
+
+class GitHubAdapter(SourceAdapter):
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        response = await client.get(
+            f"{self.base_url}/search/repositories",
+            params={"q": query, "per_page": limit},
+            headers={"Accept": "application/vnd.github+json"}
+        )
+        response.raise_for_status()
+        return [
+            SearchResult(
+                title=item["full_name"],
+                url=item["html_url"],
+                description=item.get("description") or "",
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=_parse_datetime(item.get("updated_at"))
+            )
+            for i, item in enumerate(response.json().get("items", [])[:limit])
+        ]
+
+
+class StackOverflowAdapter(SourceAdapter):
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        response = await client.get(
+            f"{self.base_url}/2.3/search/advanced",
+            params={
+                "q": query,
+                "site": "stackoverflow",
+                "order": "desc",
+                "sort": "relevance",
+                "pagesize": limit
+            }
+        )
+        response.raise_for_status()
+        return [
+            SearchResult(
+                title=item["title"],
+                url=item["link"],
+                description=", ".join(item.get("tags", [])),
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=datetime.fromtimestamp(item.get("last_activity_date", 0)) if item.get("last_activity_date") else datetime.now()
+            )
+            for i, item in enumerate(response.json().get("items", [])[:limit])
+        ]
+
+
+class NpmAdapter(SourceAdapter):
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        response = await client.get(
+            f"{self.base_url}/-/v1/search",
+            params={"text": query, "size": limit}
+        )
+        response.raise_for_status()
+        results = []
+        for i, item in enumerate(response.json().get("objects", [])[:limit]):
+            package = item["package"]
+            results.append(SearchResult(
+                title=package["name"],
+                url=package.get("links", {}).get("npm", f"https://www.npmjs.com/package/{package['name']}"),
+                description=package.get("description") or "",
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=_parse_datetime(package.get("date"))
+            ))
+        return results
+
+
+class PyPIAdapter(SourceAdapter):
+    """PyPI has no search API, so this looks the query up as a package name"""
+
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        name = _first_term(query)
+        if not name:
+            return []
+        response = await client.get(f"{self.base_url}/{quote(name)}/json")
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        info = response.json()["info"]
+        return [
+            SearchResult(
+                title=info["name"],
+                url=info.get("package_url") or f"https://pypi.org/project/{info['name']}/",
+                description=info.get("summary") or "",
+                source=self.source.value,
+                score=1.0,
+                last_updated=datetime.now()
+            )
+        ]
+
+
+class DevToAdapter(SourceAdapter):
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        tag = _first_term(query).replace(".", "").replace("-", "")
+        if not tag:
+            return []
+        response = await client.get(
+            f"{self.base_url}/articles",
+            params={"tag": tag, "per_page": limit}
+        )
+        response.raise_for_status()
+        return [
+            SearchResult(
+                title=item["title"],
+                url=item["url"],
+                description=item.get("description") or "",
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=_parse_datetime(item.get("published_at"))
+            )
+            for i, item in enumerate(response.json()[:limit])
+        ]
+
+
+class MediumAdapter(SourceAdapter):
+    """Medium's API has no search endpoint; the public tag RSS feed is used instead"""
+
+    def __init__(self, source: DataSource, base_url: str, feed_url: str = "https://medium.com/feed/tag"):
+        super().__init__(source, base_url)
+        self.feed_url = feed_url.rstrip("/")
+
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        tag = _first_term(query)
+        if not tag:
+            return []
+        response = await client.get(f"{self.feed_url}/{quote(tag)}")
+        response.raise_for_status()
+        items = ET.fromstring(response.text).findall("./channel/item")[:limit]
+        return [
+            SearchResult(
+                title=item.findtext("title", ""),
+                url=item.findtext("link", ""),
+                description=f"Medium article tagged {tag}",
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=datetime.now()
+            )
+            for i, item in enumerate(items)
+        ]
+
+
+class StubSourceAdapter(SourceAdapter):
+    """Deterministic offline adapter for tests and local development"""
+
+    requires_network = False
+
+    def __init__(self, source: DataSource, base_url: str, delay: float = 0.0, fail: bool = False):
+        super().__init__(source, base_url)
+        self.delay = delay
+        self.fail = fail
+
+    async def search(self, query: str, client, limit: int = 3) -> List[SearchResult]:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.source.value} stub configured to fail")
+        return [
+            SearchResult(
+                title=f"Example {i+1} from {self.source.value}",
+                url=f"{self.base_url}/example{i+1}",
+                description=f"Related code example or discussion about {query}",
+                source=self.source.value,
+                score=_rank_score(i, limit),
+                last_updated=datetime.now() - timedelta(days=i + 1)
+            )
+            for i in range(limit)
+        ]
+
+
+ADAPTER_CLASSES = {
+    DataSource.GITHUB: GitHubAdapter,
+    DataSource.STACKOVERFLOW: StackOverflowAdapter,
+    DataSource.NPM: NpmAdapter,
+    DataSource.PYPI: PyPIAdapter,
+    DataSource.DEV_TO: DevToAdapter,
+    DataSource.MEDIUM: MediumAdapter
+}
+
+
+def build_adapters(data_sources: dict, offline: bool = False) -> dict:
+    """One adapter per configured source; stubs when offline or httpx is missing"""
+    if offline or httpx is None:
+        return {source: StubSourceAdapter(source, url) for source, url in data_sources.items()}
+    return {source: ADAPTER_CLASSES[source](source, url) for source, url in data_sources.items()}
+
+
+def create_http_client(timeout: float = 5.0, max_connections: int = 20):
+    """Pooled HTTP client shared by every network adapter"""
+    if httpx is None:
+        return None
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        headers={"User-Agent": "aigen-code-analytics"},
+        follow_redirects=True
+    )
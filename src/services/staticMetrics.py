@@ -0,0 +1,550 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Any
+import ast
+import hashlib
+import io
+import keyword
+import math
+import os
+import re
+import threading
+import tokenize
+
+
+# Thresholds used to turn raw numbers into code smells
+MAX_COMPLEXITY = 10
+MAX_NESTING = 4
+MAX_FUNCTION_LINES = 50
+
+# Below this many files, working inline beats starting a process pool
+PARALLEL_SCAN_THRESHOLD = 8
+
+JS_KEYWORDS = {
+    "async", "await", "break", "case", "catch", "class", "const", "continue",
+    "debugger", "default", "delete", "do", "else", "export", "extends",
+    "finally", "for", "function", "if", "import", "in", "instanceof", "let",
+    "new", "return", "super", "switch", "this", "throw", "try", "typeof",
+    "var", "void", "while", "with", "yield", "of", "interface", "type",
+    "enum", "implements", "private", "public", "protected", "readonly", "as"
+}
+# Identifiers that look like `name(...) {` but are not function definitions
+JS_CONTROL = {"if", "for", "while", "switch", "catch", "with", "function", "return"}
+JS_BRANCH_TOKENS = {"if", "for", "while", "case", "catch", "&&", "||", "??", "?"}
+JS_NESTING_OPENERS = {")", "else", "try", "finally", "do", "=>"}
+
+_JS_TOKEN_RE = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<number>\b\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?n?\b|\b0[xXbBoO][\da-fA-F_]+\b)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<op>=>|\?\?=?|\?\.|\.\.\.|===|!==|\*\*=?|<<=?|>>>?=?|[-+*/%&|^!=<>]=|&&=?|\|\|=?|\+\+|--|[{}()\[\];,.<>+\-*/%&|^!~?:=@#])
+  | (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+""", re.VERBOSE | re.DOTALL)
+
+
+@dataclass
+class FunctionSource:
+    name: str
+    start_line: int
+    end_line: int
+    text: str
+    digest: str
+    # Line of the body's opening `{` (JS/TS); signatures may span several lines
+    body_line: int = 0
+
+
+@dataclass
+class FunctionMetrics:
+    name: str
+    start_line: int
+    end_line: int
+    lines_of_code: int
+    cyclomatic_complexity: int
+    halstead_volume: float
+    maintainability_index: float
+    nesting_depth: int
+
+
+@dataclass
+class FileMetrics:
+    language: str
+    lines_of_code: int
+    complexity: float
+    halstead_volume: float
+    maintainability_index: float
+    nesting_depth: int
+    functions: List[FunctionMetrics] = field(default_factory=list)
+    path: Optional[str] = None
+    recomputed_functions: int = 0
+
+
+def detect_language(code: str, path: str = None) -> str:
+    """Guess the language from the file extension, falling back to parsing"""
+    if path:
+        extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+        if extension == "py":
+            return "python"
+        if extension in ("ts", "tsx"):
+            return "typescript"
+        if extension in ("js", "jsx", "mjs", "cjs"):
+            return "javascript"
+    try:
+        ast.parse(code)
+        return "python"
+    except SyntaxError:
+        return "javascript"
+
+
+def _digest(language: str, text: str) -> str:
+    return hashlib.sha256(f"{language}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _count_loc(text: str) -> int:
+    return sum(1 for line in text.splitlines() if line.strip())
+
+
+def halstead_volume(operators: List[str], operands: List[str]) -> float:
+    """Halstead volume N * log2(n) from operator and operand occurrences"""
+    length = len(operators) + len(operands)
+    vocabulary = len(set(operators)) + len(set(operands))
+    if vocabulary < 2:
+        return float(length)
+    return round(length * math.log2(vocabulary), 2)
+
+
+def maintainability_index(volume: float, complexity: int, loc: int) -> float:
+    """Maintainability index rescaled to 0-100 (higher is better)"""
+    raw = 171 - 5.2 * math.log(max(volume, 1.0)) - 0.23 * complexity - 16.2 * math.log(max(loc, 1))
+    return round(max(0.0, min(100.0, raw * 100 / 171)), 2)
+
+
+# Python
+
+_PY_BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert)
+_PY_NESTING_NODES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef
+) + ((ast.Match,) if hasattr(ast, "Match") else ())
+
+
+def _python_complexity(tree: ast.AST) -> int:
+    complexity = 1
+    for node in ast.walk(tree):
+        if isinstance(node, _PY_BRANCH_NODES):
+            complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            complexity += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            complexity += 1 + len(node.ifs)
+        elif hasattr(ast, "match_case") and isinstance(node, ast.match_case):
+            complexity += 1
+    return complexity
+
+
+def _python_nesting(node: ast.AST, depth: int = 0) -> int:
+    deepest = depth
+    for child in ast.iter_child_nodes(node):
+        child_depth = depth + 1 if isinstance(child, _PY_NESTING_NODES) else depth
+        deepest = max(deepest, _python_nesting(child, child_depth))
+    return deepest
+
+
+def _python_halstead(text: str) -> float:
+    operators, operands = [], []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token.type == tokenize.OP or (token.type == tokenize.NAME and keyword.iskeyword(token.string)):
+                operators.append(token.string)
+            elif token.type in (tokenize.NAME, tokenize.NUMBER, tokenize.STRING):
+                operands.append(token.string)
+    except (tokenize.TokenError, IndentationError):
+        pass
+    return halstead_volume(operators, operands)
+
+
+def _dedent_block(lines: List[str], indent: int) -> str:
+    """Remove the def line's indentation, leaving less-indented lines (inside strings) alone"""
+    prefix = lines[0][:indent]
+    return "\n".join(line[indent:] if line.startswith(prefix) else line for line in lines)
+
+
+def _extract_python_functions(code: str) -> List[FunctionSource]:
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    functions = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            end = getattr(node, "end_lineno", None) or node.lineno
+            text = _dedent_block(lines[node.lineno - 1:end], node.col_offset)
+            functions.append(FunctionSource(node.name, node.lineno, end, text, _digest("python", text)))
+    return sorted(functions, key=lambda f: f.start_line)
+
+
+def _python_function_metrics(text: str) -> Dict[str, Any]:
+    tree = ast.parse(text)
+    function = tree.body[0]
+    complexity = _python_complexity(function)
+    volume = _python_halstead(text)
+    loc = _count_loc(text)
+    return {
+        "lines_of_code": loc,
+        "cyclomatic_complexity": complexity,
+        "halstead_volume": volume,
+        "maintainability_index": maintainability_index(volume, complexity, loc),
+        # The def itself does not count as a nesting level
+        "nesting_depth": _python_nesting(function)
+    }
+
+
+# TypeScript / JavaScript
+
+def tokenize_js(code: str) -> List[Tuple[str, str, int]]:
+    """Split TS/JS source into (kind, text, line) tokens, dropping comments and whitespace"""
+    tokens = []
+    line = 1
+    position = 0
+    while position < len(code):
+        match = _JS_TOKEN_RE.match(code, position)
+        if match is None:
+            # Unknown character (e.g. non-ASCII identifier); skip it
+            position += 1
+            continue
+        kind, text = match.lastgroup, match.group()
+        if kind not in ("comment", "space", "newline"):
+            if kind == "name" and text in JS_KEYWORDS:
+                kind = "keyword"
+            tokens.append((kind, text, line))
+        line += text.count("\n")
+        position = match.end()
+    return tokens
+
+
+def _matching(tokens: List[Tuple[str, str, int]], start: int, open_text: str, close_text: str) -> int:
+    depth = 0
+    for index in range(start, len(tokens)):
+        if tokens[index][1] == open_text:
+            depth += 1
+        elif tokens[index][1] == close_text:
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _js_function_name(tokens: List[Tuple[str, str, int]], paren: int, is_arrow: bool) -> Optional[str]:
+    """Name of the function whose parameter list starts at paren, or None if it is not a definition"""
+    before = paren - 1
+    # Skip generic parameters: name<T>(...)
+    if before >= 0 and tokens[before][1] == ">":
+        while before >= 0 and tokens[before][1] != "<":
+            before -= 1
+        before -= 1
+
+    if is_arrow:
+        if before >= 0 and tokens[before][1] == "async":
+            before -= 1
+        # Arrow function assigned to a name: name = (...) => / name: (...) =>
+        if before >= 1 and tokens[before][1] in ("=", ":") and tokens[before - 1][0] == "name":
+            return tokens[before - 1][1]
+        # Typed declaration: const name: Type<Props> = (...) =>
+        if before >= 0 and tokens[before][1] == "=":
+            for scan in range(before - 1, max(before - 30, 0) - 1, -1):
+                if tokens[scan][1] in (";", "{", "}"):
+                    break
+                if tokens[scan][1] in ("const", "let", "var") and tokens[scan + 1][0] == "name":
+                    return tokens[scan + 1][1]
+        return "<anonymous>"
+
+    if before < 0:
+        return None
+    kind, text, _ = tokens[before]
+    if text == "function":
+        return "<anonymous>"
+    if kind in ("name", "keyword") and text not in JS_CONTROL:
+        # Named function or method shorthand: name(...) { ... }
+        return text
+    return None
+
+
+def _extract_js_functions(code: str) -> List[FunctionSource]:
+    tokens = tokenize_js(code)
+    lines = code.splitlines()
+    functions = []
+    # `=>` tokens already handled as a parenthesized arrow's; a return type
+    # like `): T | null =>` must not be re-read as a bare `null => {` arrow
+    consumed_arrows = set()
+    for index, (kind, text, _) in enumerate(tokens):
+        if text == "(":
+            close = _matching(tokens, index, "(", ")")
+            after = close + 1
+            # Optional return type annotation before the body
+            if after < len(tokens) and tokens[after][1] == ":":
+                scan = after + 1
+                while scan < len(tokens) and scan - after < 40 and tokens[scan][1] not in ("{", "=>", ";"):
+                    scan += 1
+                if scan < len(tokens) and tokens[scan][1] == "{" and tokens[scan - 1][1] in (":", "{", "(", ","):
+                    # `{` starts an object type, not the body
+                    continue
+                after = scan
+            is_arrow = after < len(tokens) and tokens[after][1] == "=>"
+            if is_arrow:
+                consumed_arrows.add(after)
+                after += 1
+            if after >= len(tokens) or tokens[after][1] != "{":
+                continue
+            name = _js_function_name(tokens, index, is_arrow)
+            if name is None:
+                continue
+        elif text == "=>" and index > 0 and tokens[index - 1][0] == "name" and index not in consumed_arrows:
+            # Single-parameter arrow without parentheses: x => { ... }
+            after = index + 1
+            if after >= len(tokens) or tokens[after][1] != "{":
+                continue
+            name = _js_function_name(tokens, index - 1, True)
+        else:
+            continue
+
+        body_end = _matching(tokens, after, "{", "}")
+        start_line = tokens[index][2]
+        end_line = tokens[body_end][2]
+        text_block = "\n".join(lines[start_line - 1:end_line])
+        functions.append(FunctionSource(
+            name, start_line, end_line, text_block, _digest("javascript", text_block), body_line=tokens[after][2]
+        ))
+    return functions
+
+
+def _is_optional_marker(tokens: List[Tuple[str, str, int]], index: int) -> bool:
+    """True for TS optional markers (`name?: T`, `arg?)`) rather than a ternary `?`"""
+    return (
+        tokens[index][1] == "?"
+        and index + 1 < len(tokens)
+        and tokens[index + 1][1] in (":", ")", ",")
+    )
+
+
+def _js_function_metrics(text: str) -> Dict[str, Any]:
+    tokens = tokenize_js(text)
+    complexity = 1 + sum(
+        1 for index, (_, token, _) in enumerate(tokens)
+        if token in JS_BRANCH_TOKENS and not _is_optional_marker(tokens, index)
+    )
+    operators = [token for kind, token, _ in tokens if kind in ("op", "keyword")]
+    operands = [token for kind, token, _ in tokens if kind in ("name", "number", "string")]
+
+    # Only count braces that open blocks, not object literals
+    depth, deepest, stack = 0, 0, []
+    for index, (_, token, _) in enumerate(tokens):
+        if token == "{":
+            is_block = index > 0 and tokens[index - 1][1] in JS_NESTING_OPENERS
+            stack.append(is_block)
+            if is_block:
+                depth += 1
+                deepest = max(deepest, depth)
+        elif token == "}" and stack:
+            if stack.pop():
+                depth -= 1
+
+    volume = halstead_volume(operators, operands)
+    loc = _count_loc(text)
+    return {
+        "lines_of_code": loc,
+        "cyclomatic_complexity": complexity,
+        "halstead_volume": volume,
+        "maintainability_index": maintainability_index(volume, complexity, loc),
+        # The function body itself does not count as a nesting level
+        "nesting_depth": max(deepest - 1, 0)
+    }
+
+
+def extract_functions(code: str, language: str) -> List[FunctionSource]:
+    if language == "python":
+        return _extract_python_functions(code)
+    return _extract_js_functions(code)
+
+
+def compute_function_metrics(text: str, language: str) -> Dict[str, Any]:
+    """Position-independent metrics for a single function's source"""
+    if language == "python":
+        return _python_function_metrics(text)
+    return _js_function_metrics(text)
+
+
+def _analyze_file_job(path: str, code: str, language: str, known: frozenset) -> tuple:
+    """Process-pool worker: parse one file and compute metrics for unseen functions"""
+    functions = extract_functions(code, language)
+    computed = {}
+    for function in functions:
+        if function.digest not in known and function.digest not in computed:
+            computed[function.digest] = compute_function_metrics(function.text, language)
+    # Function text is not needed by the parent; keep the result small to pickle
+    for function in functions:
+        function.text = ""
+    return path, language, functions, computed
+
+
+def _analyze_files_job(items: List[Tuple[str, str, str]], known: frozenset) -> List[tuple]:
+    """Process-pool worker: analyze a batch of (path, code, language); files that fail to parse are left out"""
+    analyzed = []
+    for path, code, language in items:
+        try:
+            analyzed.append(_analyze_file_job(path, code, language, known))
+        except SyntaxError:
+            continue
+    return analyzed
+
+
+class StaticMetricsEngine:
+    """
+    Local code-quality metrics with a per-function cache.
+
+    Function metrics are cached by a hash of the function's source, so
+    re-analyzing an edited file only recomputes the functions that changed.
+    """
+
+    def __init__(self, max_cached_functions: int = 4096, max_workers: int = None):
+        self.max_cached_functions = max_cached_functions
+        self.max_workers = max_workers
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            metrics = self._cache.get(digest)
+            if metrics is not None:
+                self._cache.move_to_end(digest)
+            return metrics
+
+    def _cache_set(self, digest: str, metrics: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[digest] = metrics
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_cached_functions:
+                self._cache.popitem(last=False)
+
+    def _assemble(self, code: str, language: str, functions: List[FunctionSource], computed: Dict[str, Dict[str, Any]],
+                  path: str = None, pinned: Dict[str, Dict[str, Any]] = None) -> FileMetrics:
+        results = []
+        for function in functions:
+            metrics = computed.get(function.digest) or (pinned or {}).get(function.digest) or self._cache_get(function.digest)
+            if metrics is None:
+                # Evicted between the worker's snapshot and now
+                metrics = compute_function_metrics(function.text, language) if function.text else None
+                if metrics is None:
+                    continue
+            self._cache_set(function.digest, metrics)
+            results.append(FunctionMetrics(
+                name=function.name,
+                start_line=function.start_line,
+                end_line=function.end_line,
+                **metrics
+            ))
+
+        if results:
+            complexity = round(sum(f.cyclomatic_complexity for f in results) / len(results), 2)
+            volume = round(sum(f.halstead_volume for f in results), 2)
+            index = round(sum(f.maintainability_index for f in results) / len(results), 2)
+            nesting = max(f.nesting_depth for f in results)
+        else:
+            # No functions: score the file as a single unit
+            whole = self._module_metrics(code, language)
+            complexity = float(whole["cyclomatic_complexity"])
+            volume = whole["halstead_volume"]
+            index = whole["maintainability_index"]
+            nesting = whole["nesting_depth"]
+
+        return FileMetrics(
+            language=language,
+            lines_of_code=len(code.splitlines()),
+            complexity=complexity,
+            halstead_volume=volume,
+            maintainability_index=index,
+            nesting_depth=nesting,
+            functions=results,
+            path=path,
+            recomputed_functions=len(computed)
+        )
+
+    def _module_metrics(self, code: str, language: str) -> Dict[str, Any]:
+        if language == "python":
+            tree = ast.parse(code)
+            complexity = _python_complexity(tree)
+            volume = _python_halstead(code)
+            nesting = _python_nesting(tree)
+        else:
+            metrics = _js_function_metrics(code)
+            complexity, volume = metrics["cyclomatic_complexity"], metrics["halstead_volume"]
+            nesting = metrics["nesting_depth"] + 1
+        loc = _count_loc(code)
+        return {
+            "cyclomatic_complexity": complexity,
+            "halstead_volume": volume,
+            "maintainability_index": maintainability_index(volume, complexity, loc),
+            "nesting_depth": nesting
+        }
+
+    def analyze(self, code: str, language: str = None, path: str = None) -> FileMetrics:
+        """Metrics for a single file; unchanged functions come from the cache"""
+        language = language or detect_language(code, path)
+        if language not in ("python", "typescript", "javascript", "react"):
+            language = "javascript"
+        try:
+            functions = extract_functions(code, language)
+        except SyntaxError:
+            # Unparseable Python still gets token-level metrics
+            language = "javascript"
+            functions = extract_functions(code, language)
+
+        computed = {}
+        for function in functions:
+            if function.digest not in computed and self._cache_get(function.digest) is None:
+                computed[function.digest] = compute_function_metrics(function.text, language)
+        return self._assemble(code, language, functions, computed, path)
+
+    def analyze_files(self, files: Dict[str, str], max_workers: int = None) -> Dict[str, FileMetrics]:
+        """Metrics for many files, parsing them in parallel across a process pool when there are enough"""
+        # Workers skip functions in this snapshot, so hold on to their metrics:
+        # caching earlier files' results may evict them before later files are assembled
+        with self._lock:
+            pinned = dict(self._cache)
+        known = frozenset(pinned)
+        items = [(path, code, detect_language(code, path)) for path, code in files.items()]
+
+        if len(items) < PARALLEL_SCAN_THRESHOLD:
+            analyzed = _analyze_files_job(items, known)
+        else:
+            workers = max_workers or self.max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # A few batches per worker, so the known digests are pickled per batch rather than per file
+                batch_count = min(workers * 4, len(items))
+                batches = [items[index::batch_count] for index in range(batch_count)]
+                analyzed = [item for batch in pool.map(_analyze_files_job, batches, [known] * len(batches)) for item in batch]
+
+        results = {}
+        for path, language, functions, computed in analyzed:
+            results[path] = self._assemble(files[path], language, functions, computed, path, pinned)
+
+        # Files the pool could not parse as their guessed language
+        for path, code in files.items():
+            if path not in results:
+                results[path] = self.analyze(code, "javascript", path)
+        return results
+
+
+def code_smells(metrics: FileMetrics) -> Tuple[List[str], List[str]]:
+    """Turn metrics into human-readable smells and matching suggestions"""
+    smells, suggestions = [], []
+    for function in metrics.functions:
+        if function.cyclomatic_complexity > MAX_COMPLEXITY:
+            smells.append(f"High complexity in {function.name} ({function.cyclomatic_complexity})")
+            suggestions.append(f"Extract smaller functions from {function.name}")
+        if function.nesting_depth >= MAX_NESTING:
+            smells.append(f"Deep nesting in {function.name} (depth {function.nesting_depth})")
+            suggestions.append(f"Use early returns or guard clauses in {function.name}")
+        if function.lines_of_code > MAX_FUNCTION_LINES:
+            smells.append(f"Long method {function.name} ({function.lines_of_code} lines)")
+            suggestions.append(f"Split {function.name} into smaller steps")
+    return smells, suggestions
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+from benchmarks.fake_gemini import FakeGeminiModel, LatencyDistribution
+from src.pages.api import code_agent
+from src.services.instrumentation import ERRORS, IN_FLIGHT, STAGE_SECONDS
+from src.services.responseCache import ResponseCache
+
+
+def _disconnected_count() -> float:
+    return ERRORS._values.get(("client_disconnected",), 0.0)
+
+
+def _request_total_seconds() -> float:
+    series = STAGE_SECONDS._series.get(("request_total",))
+    return series[1] if series else 0.0
+
+
+async def _post(path: str, body: dict, disconnect_after: float = 3600.0, on_send=None):
+    """Drive the ASGI app directly; the client goes away after disconnect_after seconds"""
+    payload = json.dumps(body).encode()
+    sent_body = False
+    messages = []
+    # Like a server, report the disconnect immediately once the socket has closed
+    disconnect_at = time.perf_counter() + disconnect_after
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        remaining = disconnect_at - time.perf_counter()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if on_send:
+            on_send(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    await code_agent.app(scope, receive, send)
+    return messages
+
+
+def test_disconnect_cancels_model_call(monkeypatch):
+    assistant = code_agent.assistant
+    monkeypatch.setattr(assistant, "model", FakeGeminiModel(latency=LatencyDistribution("fixed", 20000)))
+    monkeypatch.setattr(assistant, "cache", ResponseCache(max_entries=0))
+    monkeypatch.setattr(code_agent, "DISCONNECT_POLL_INTERVAL", 0.05)
+    disconnects = _disconnected_count()
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.wait_for(
+            _post("/api/analyze-code", {"code": "x = 1", "query": "disconnect test"}, 0.2),
+            timeout=5
+        )
+        elapsed = time.perf_counter() - started
+        # Let the cancelled model call unwind
+        await asyncio.sleep(0.05)
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    assert elapsed < 2
+    assert assistant.scheduler.stats()["in_flight"] == 0
+    assert _disconnected_count() == disconnects + 1
+
+
+def test_stream_counts_in_flight_until_body_ends(monkeypatch):
+    assistant = code_agent.assistant
+    # 20 chunks at 100/s: the body takes ~0.2s after headers are sent
+    model = FakeGeminiModel(latency=LatencyDistribution("fixed", 10), chunk_count=20, chunk_rate=100)
+    monkeypatch.setattr(assistant, "model", model)
+    monkeypatch.setattr(assistant, "cache", ResponseCache(max_entries=0))
+    in_flight_during_body = []
+
+    def on_send(message):
+        if message["type"] == "http.response.body" and message.get("more_body"):
+            in_flight_during_body.append(IN_FLIGHT._value)
+
+    before = _request_total_seconds()
+    messages = asyncio.run(_post("/api/analyze-code/stream", {"code": "x = 1", "query": "stream timing"}, on_send=on_send))
+
+    assert b"event: done" in b"".join(m.get("body", b"") for m in messages)
+    assert in_flight_during_body and min(in_flight_during_body) >= 1
+    assert IN_FLIGHT._value == 0
+    assert _request_total_seconds() - before >= 0.15
+
+
+def test_analyze_project_rejects_malformed_fields_before_streaming():
+    tree = [{"name": "a.py", "path": "a.py", "type": "file", "content": "x = 1"}]
+    for body in ({"files": {"a.py": "x = 1"}}, {"files": tree, "token_budget": "big"},
+                 {"files": tree, "token_budget": 0}, {"files": tree, "query": ["explain"]}):
+        messages = asyncio.run(_post("/api/analyze-project", body))
+
+        assert messages[0]["status"] == 200
+        assert dict(messages[0]["headers"])[b"content-type"] == b"application/json"
+        assert json.loads(messages[1]["body"])["status"] == "error"
+
+
+def test_stream_rejects_non_string_code_before_streaming():
+    messages = asyncio.run(_post("/api/analyze-code/stream", {"code": 123, "query": "hi"}))
+
+    assert dict(messages[0]["headers"])[b"content-type"] == b"application/json"
+    assert json.loads(messages[1]["body"])["status"] == "error"
@@ -0,0 +1,15 @@
+import asyncio
+
+from src.services.codeAgent import CodeAnalyticsService
+
+
+def test_sync_analysis_works_inside_running_loop():
+    service = CodeAnalyticsService(offline=True)
+
+    async def call_from_async_code():
+        return service.get_comprehensive_analysis("def f(x):\n    return x\n", "identity")
+
+    result = asyncio.run(call_from_async_code())
+
+    assert result["status"] == "success"
+    assert result["related_resources"]
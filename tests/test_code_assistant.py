@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from benchmarks.fake_gemini import FakeGeminiModel, LatencyDistribution
+from src.services.codeAgent import CodeAssistant
+from src.services.promptBuilder import PromptBuilder
+from src.services.responseCache import ResponseCache
+
+LARGE_CODE = "\n".join(
+    f"def handler_{n}(request):\n    # comment {n}\n    value = request.get('{n}')\n    return value * {n}\n"
+    for n in range(300)
+)
+
+
+def _assistant(max_tokens: int = 8000) -> CodeAssistant:
+    assistant = CodeAssistant()
+    assistant.model = FakeGeminiModel(latency=LatencyDistribution("fixed", 1), chunk_count=3, chunk_rate=0)
+    assistant.cache = ResponseCache(max_entries=100)
+    assistant.prompt_builder = PromptBuilder(max_tokens=max_tokens)
+    return assistant
+
+
+def _count_calls(monkeypatch, target, name):
+    calls = []
+    original = getattr(target, name)
+
+    def counting(*args, **kwargs):
+        calls.append(threading.get_ident())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(target, name, counting)
+    return calls
+
+
+def test_cache_hit_skips_prompt_building(monkeypatch):
+    assistant = _assistant(max_tokens=500)
+    builds = _count_calls(monkeypatch, assistant, "_build_prompt")
+
+    async def run():
+        first = await assistant.analyze_code_async(LARGE_CODE, "Explain handler_7")
+        second = await assistant.analyze_code_async(LARGE_CODE, "Explain handler_7")
+        events = [event async for event in assistant.stream_analysis(LARGE_CODE, "Explain handler_7")]
+        return first, second, events
+
+    first, second, events = asyncio.run(run())
+    assert first["status"] == "success" and second["cached"] is True
+    assert events[-1]["cached"] is True
+    assert len(builds) == 1
+
+
+def test_compaction_runs_off_the_event_loop(monkeypatch):
+    assistant = _assistant(max_tokens=500)
+    compactions = _count_calls(monkeypatch, assistant.prompt_builder, "compact")
+
+    async def run():
+        result = await assistant.analyze_code_async(LARGE_CODE, "Explain handler_7")
+        events = [event async for event in assistant.stream_analysis(LARGE_CODE, "Explain handler_8")]
+        return result, events, threading.get_ident()
+
+    result, events, loop_thread = asyncio.run(run())
+    assert result["status"] == "success" and result["prompt_tokens"]["strategies"]
+    assert events[-1]["status"] == "success"
+    assert len(compactions) == 2 and loop_thread not in compactions
+
+
+def test_stream_reports_prompt_building_failure_as_done_event(monkeypatch):
+    assistant = _assistant()
+
+    def fail(code, query):
+        raise ValueError("cannot parse")
+
+    monkeypatch.setattr(assistant, "_build_prompt", fail)
+
+    async def run():
+        return [event async for event in assistant.stream_analysis("x = 1", "Explain")]
+
+    events = asyncio.run(run())
+    assert [event["event"] for event in events] == ["done"]
+    assert events[0]["status"] == "error"
+    assert "cannot parse" in events[0]["response"]
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+from src.services import historyStore
+from src.services.historyStore import AnalysisHistory
+
+
+def _fill(history: AnalysisHistory, monkeypatch, count: int, languages=("python", "typescript")):
+    """Append count entries recorded one second apart, starting at t=1000"""
+    clock = iter(range(1000, 1000 + count))
+    with monkeypatch.context() as patch:
+        patch.setattr(historyStore.time, "time", lambda: float(next(clock)))
+        for n in range(count):
+            history.append({"status": "success", "n": n}, language=languages[n % len(languages)])
+
+
+def _ids(entries):
+    return [entry["id"] for entry in entries]
+
+
+def test_ring_buffer_keeps_only_the_newest_entries(monkeypatch):
+    history = AnalysisHistory(buffer_size=3)
+    _fill(history, monkeypatch, 5)
+
+    assert history.count() == 3
+    assert _ids(history.query()) == [5, 4, 3]
+
+
+def test_pages_are_newest_first_across_buffer_and_disk(tmp_path, monkeypatch):
+    history = AnalysisHistory(path=str(tmp_path / "history.db"), buffer_size=3)
+    _fill(history, monkeypatch, 10)
+
+    assert history.count() == 10
+    assert _ids(history.query(offset=0, limit=3)) == [10, 9, 8]
+    assert _ids(history.query(offset=2, limit=4)) == [8, 7, 6, 5]
+    assert _ids(history.query(offset=8, limit=4)) == [2, 1]
+
+
+def test_recent_pages_are_served_from_memory(tmp_path, monkeypatch):
+    history = AnalysisHistory(path=str(tmp_path / "history.db"), buffer_size=5)
+    _fill(history, monkeypatch, 8)
+
+    def no_disk():
+        raise AssertionError("read the SQLite file")
+
+    monkeypatch.setattr(history, "flush", no_disk)
+    assert _ids(history.query(limit=5)) == [8, 7, 6, 5, 4]
+    assert _ids(history.query(limit=2, language="python")) == [7, 5]
+
+
+def test_time_and_language_filters(tmp_path, monkeypatch):
+    for path in (None, str(tmp_path / "history.db")):
+        history = AnalysisHistory(path=path, buffer_size=10)
+        _fill(history, monkeypatch, 6)
+
+        assert _ids(history.query(since=1002, until=1005)) == [5, 4, 3]
+        assert _ids(history.query(language="typescript")) == [6, 4, 2]
+        assert history.count(since=1002, language="python") == 2
+
+
+def test_iter_entries_fetches_in_batches_oldest_first(tmp_path, monkeypatch):
+    history = AnalysisHistory(path=str(tmp_path / "history.db"), buffer_size=2)
+    _fill(history, monkeypatch, 7)
+
+    assert _ids(history.iter_entries(batch_size=3)) == [1, 2, 3, 4, 5, 6, 7]
+    assert _ids(history.iter_entries(language="python", batch_size=2)) == [1, 3, 5, 7]
+
+
+def test_exports(tmp_path, monkeypatch):
+    history = AnalysisHistory(path=str(tmp_path / "history.db"), buffer_size=2)
+    _fill(history, monkeypatch, 3)
+
+    documents = [json.loads(line) for line in history.export_ndjson(language="python")]
+    assert [(d["id"], d["result"]["n"]) for d in documents] == [(1, 0), (3, 2)]
+
+    rows = list(csv.reader(io.StringIO("".join(history.export_csv()))))
+    assert rows[0] == historyStore.CSV_COLUMNS
+    assert [(row[0], row[2], row[3]) for row in rows[1:]] == [
+        ("1", "python", "success"), ("2", "typescript", "success"), ("3", "python", "success")
+    ]
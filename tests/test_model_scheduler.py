@@ -0,0 +1,169 @@
+import asyncio
+
+from benchmarks.fake_gemini import FakeGeminiModel, LatencyDistribution
+from src.services.codeAgent import CodeAssistant
+from src.services.modelScheduler import ModelScheduler, PRIORITY_BATCH, PRIORITY_INTERACTIVE, is_rate_limit_error
+from src.services.responseCache import ResponseCache
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+def test_identical_calls_coalesce_into_one_upstream_call():
+    scheduler = ModelScheduler()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*[scheduler.run(call, key="same prompt") for _ in range(10)])
+
+    assert asyncio.run(run()) == ["answer"] * 10
+    assert calls == 1
+    assert scheduler.stats()["coalesced"] == 9
+
+
+def test_identical_prompts_make_one_model_call():
+    assistant = CodeAssistant()
+    assistant.model = FakeGeminiModel(latency=LatencyDistribution("fixed", 50), chunk_rate=0)
+    assistant.cache = ResponseCache(max_entries=0)
+
+    async def run():
+        return await asyncio.gather(*[assistant.analyze_code_async("x = 1", "Explain") for _ in range(8)])
+
+    results = asyncio.run(run())
+    assert [r["status"] for r in results] == ["success"] * 8
+    assert assistant.model.calls == 1
+
+
+def test_shared_call_cancelled_only_after_last_waiter_leaves():
+    scheduler = ModelScheduler()
+    cancelled = []
+
+    async def run():
+        running = asyncio.Event()
+
+        async def call():
+            running.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        first = asyncio.ensure_future(scheduler.run(call, key="k"))
+        second = asyncio.ensure_future(scheduler.run(call, key="k"))
+        await running.wait()
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert cancelled == []
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert cancelled == [True]
+
+    asyncio.run(run())
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["in_flight_keys"] == 0
+
+
+def test_no_slot_leak_when_cancelled_right_after_admission():
+    scheduler = ModelScheduler(max_concurrency=1)
+
+    async def run():
+        await scheduler.acquire()
+        waiter = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0)
+        # Admits the waiter, which is cancelled before it gets to run
+        scheduler.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()["in_flight"] == 0
+
+        # The slot is usable again
+        await asyncio.wait_for(scheduler.acquire(), timeout=1)
+        scheduler.release()
+
+    asyncio.run(run())
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_interactive_requests_overtake_queued_batch_requests():
+    scheduler = ModelScheduler(max_concurrency=1)
+    order = []
+
+    def recorder(name):
+        async def call():
+            order.append(name)
+            await asyncio.sleep(0.01)
+        return call
+
+    async def run():
+        await scheduler.acquire()
+        tasks = [asyncio.ensure_future(scheduler.run(recorder(f"batch-{n}"), priority=PRIORITY_BATCH)) for n in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(scheduler.run(recorder("interactive"), priority=PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"] == {"interactive": 1, "batch": 3}
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["interactive", "batch-0", "batch-1", "batch-2"]
+
+
+def test_rate_limited_call_is_retried_and_counted():
+    scheduler = ModelScheduler(backoff_base=0.001)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ResourceExhausted("429 Resource has been exhausted")
+        return "answer"
+
+    assert asyncio.run(scheduler.run(call)) == "answer"
+    assert attempts == 2
+    stats = scheduler.stats()
+    assert stats["retries"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["failures"] == 0
+
+
+def test_rate_limit_detection_ignores_429_inside_messages():
+    assert is_rate_limit_error(Exception("429 Resource has been exhausted"))
+    assert is_rate_limit_error(ResourceExhausted("quota"))
+    assert not is_rate_limit_error(ValueError("Invalid value at position 1429"))
+    assert not is_rate_limit_error(RuntimeError("request 4290 failed"))
+
+
+class FirstCallRateLimited(FakeGeminiModel):
+    def _maybe_fail(self) -> None:
+        if self.calls == 1:
+            raise ResourceExhausted("429 Resource has been exhausted")
+
+
+def test_stream_rate_limited_before_first_chunk_is_retried():
+    assistant = CodeAssistant()
+    assistant.model = FirstCallRateLimited(latency=LatencyDistribution("fixed", 1), chunk_count=3, chunk_rate=0)
+    assistant.cache = ResponseCache(max_entries=0)
+    assistant.scheduler = ModelScheduler(backoff_base=0.001)
+
+    async def run():
+        return [event async for event in assistant.stream_analysis("x = 1", "Explain")]
+
+    events = asyncio.run(run())
+    assert [event["event"] for event in events] == ["chunk"] * 3 + ["done"]
+    assert events[-1]["status"] == "success"
+    assert assistant.model.calls == 2
+    stats = assistant.scheduler.stats()
+    assert (stats["retries"], stats["rate_limited"], stats["in_flight"]) == (1, 1, 0)
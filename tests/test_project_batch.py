@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+from src.services.codeAgent import CodeAssistant
+from src.services.projectBatch import FILE_HEADER_RE
+from src.services.promptBuilder import PromptBuilder
+from src.services.responseCache import ResponseCache
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class HeaderlessModel:
+    """Answers every prompt without `### FILE:` headers"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.prompts.append(prompt)
+        return _Response(f"Answer for {len(FILE_HEADER_RE.findall(prompt))} file(s)")
+
+
+def _assistant(model) -> CodeAssistant:
+    assistant = CodeAssistant()
+    assistant.model = model
+    assistant.cache = ResponseCache(max_entries=100)
+    return assistant
+
+
+def _tree(count: int, lines: int = 3):
+    return [
+        {"name": f"m{n}.py", "path": f"m{n}.py", "type": "file",
+         "content": "\n".join(f"def f{n}_{i}(x):\n    return x + {i}\n" for i in range(lines))}
+        for n in range(count)
+    ]
+
+
+async def _collect(assistant: CodeAssistant, tree, **kwargs):
+    return [event async for event in assistant.analyze_project(tree, "Explain", **kwargs)]
+
+
+def test_files_missing_from_batch_answer_are_retried_singly():
+    model = HeaderlessModel()
+    events = asyncio.run(_collect(_assistant(model), _tree(3)))
+
+    done = events[-1]
+    assert done["succeeded"] == 3 and done["failed"] == 0
+    # One batch prompt, then one prompt per unanswered file
+    assert len(model.prompts) == 4
+
+
+def test_cached_project_files_skip_compaction(monkeypatch):
+    assistant = _assistant(HeaderlessModel())
+    tree = _tree(2, lines=400)
+    compactions = []
+    compact = PromptBuilder.compact
+
+    def counting_compact(builder, *args, **kwargs):
+        compactions.append(threading.get_ident())
+        return compact(builder, *args, **kwargs)
+
+    monkeypatch.setattr(PromptBuilder, "compact", counting_compact)
+
+    asyncio.run(_collect(assistant, tree, token_budget=1000))
+    assert len(compactions) == 2
+    # Compaction ran off the event loop's thread
+    assert threading.get_ident() not in compactions
+
+    events = asyncio.run(_collect(assistant, tree, token_budget=1000))
+    assert all(event.get("cached") for event in events[:-1])
+    assert len(compactions) == 2
+
+
+def test_failed_project_analysis_still_ends_with_done_event():
+    assistant = _assistant(HeaderlessModel())
+
+    events = asyncio.run(_collect(assistant, ["not a file node"]))
+
+    assert [event["event"] for event in events] == ["done"]
+    assert events[-1]["status"] == "error"
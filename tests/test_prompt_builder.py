@@ -0,0 +1,76 @@
+from src.services.promptBuilder import collapse_bodies, strip_comments
+
+
+def test_strip_comments_keeps_blank_lines_inside_python_strings():
+    code = (
+        "def f():\n"
+        "    # comment\n"
+        "    text = \"\"\"first\n"
+        "\n"
+        "third\"\"\"\n"
+        "\n"
+        "    return text  # done\n"
+    )
+
+    assert strip_comments(code, "python") == (
+        "def f():\n"
+        "    text = \"\"\"first\n"
+        "\n"
+        "third\"\"\"\n"
+        "    return text"
+    )
+
+
+def test_strip_comments_keeps_blank_lines_inside_template_literals():
+    code = (
+        "// header\n"
+        "const text = `first\n"
+        "\n"
+        "third`;\n"
+        "/* block\n"
+        "   comment */\n"
+        "\n"
+        "const url = \"http://example.com\";\n"
+    )
+
+    assert strip_comments(code, "typescript") == (
+        "const text = `first\n"
+        "\n"
+        "third`;\n"
+        "const url = \"http://example.com\";"
+    )
+
+
+def test_strip_comments_keeps_regex_literals():
+    code = (
+        "const isUrl = /^https?:\\/\\//.test(s);\n"
+        "const half = total / 2 / count; // ratio\n"
+        "return /[/*]/.test(s);\n"
+    )
+
+    assert strip_comments(code, "javascript") == (
+        "const isUrl = /^https?:\\/\\//.test(s);\n"
+        "const half = total / 2 / count; \n"
+        "return /[/*]/.test(s);"
+    )
+
+
+def test_collapse_bodies_keeps_multi_line_signatures():
+    code = (
+        "export function handler(\n"
+        "  req: Request,\n"
+        "  res: Response\n"
+        "): Promise<void> {\n"
+        "  const body = parse(req);\n"
+        "  return send(res, body);\n"
+        "}\n"
+    )
+
+    assert collapse_bodies(code, "typescript", set()) == (
+        "export function handler(\n"
+        "  req: Request,\n"
+        "  res: Response\n"
+        "): Promise<void> {\n"
+        "  /* ... */\n"
+        "}"
+    )
@@ -0,0 +1,40 @@
+import asyncio
+import sqlite3
+import time
+
+from src.services.responseCache import ResponseCache
+
+
+def test_async_disk_access_does_not_block_event_loop(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path)
+    # Another worker holds the write lock, so disk writes wait on the busy timeout
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        started = time.perf_counter()
+        await cache.aset("key", {"status": "success", "response": "cached"})
+        assert await cache.aget("key") == {"status": "success", "response": "cached"}
+        assert await cache.aget("missing") is None
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(run())
+    assert elapsed < 0.2
+    assert ticks >= 15
+
+    other.execute("COMMIT")
+    cache._write_executor.submit(lambda: None).result()
+    assert ResponseCache(path=path).get("key") == {"status": "success", "response": "cached"}
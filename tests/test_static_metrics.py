@@ -0,0 +1,49 @@
+from src.services import staticMetrics
+from src.services.staticMetrics import PARALLEL_SCAN_THRESHOLD, StaticMetricsEngine, extract_functions
+
+
+def _module(index: int) -> str:
+    return "\n".join(
+        f"def f{index}_{n}(x):\n    if x > {n}:\n        return x\n    return {index}\n"
+        for n in range(5)
+    )
+
+
+def test_analyze_files_keeps_functions_evicted_during_assembly():
+    for count in (4, PARALLEL_SCAN_THRESHOLD + 2):
+        files = {f"f{index}.py": _module(index) for index in range(count)}
+        engine = StaticMetricsEngine(max_cached_functions=10, max_workers=2)
+        # Warm the cache so workers skip f3.py's functions
+        engine.analyze(files["f3.py"], path="f3.py")
+
+        results = engine.analyze_files(files)
+
+        assert {path: len(metrics.functions) for path, metrics in results.items()} == {path: 5 for path in files}
+
+
+def test_small_batches_are_analyzed_without_a_process_pool(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("started a process pool")
+
+    monkeypatch.setattr(staticMetrics, "ProcessPoolExecutor", no_pool)
+    files = {f"f{index}.py": _module(index) for index in range(PARALLEL_SCAN_THRESHOLD - 2)}
+    files["broken.js"] = "function broken( {"
+
+    results = StaticMetricsEngine().analyze_files(files)
+
+    assert set(results) == set(files)
+    assert len(results["f0.py"].functions) == 5
+
+
+def test_arrow_with_return_type_is_extracted_once():
+    code = (
+        "const findFirstFile = (files: F[]): F | null => {\n"
+        "  return files.find(file => {\n"
+        "    return file.type === 'file';\n"
+        "  }) || null;\n"
+        "};\n"
+    )
+
+    functions = extract_functions(code, "typescript")
+
+    assert [(f.name, f.start_line) for f in functions] == [("findFirstFile", 1), ("<anonymous>", 2)]